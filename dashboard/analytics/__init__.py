@@ -0,0 +1,23 @@
+"""
+Network-wide station metrics computed on station x time NumPy matrices
+instead of per-station ORM aggregates, and the seasonal baselines behind
+the empty/full forecasts.
+"""
+from dashboard.analytics.forecast import (
+    minutes_until, train_baselines, update_baselines, upcoming_rates,
+)
+from dashboard.analytics.matrix import StationMatrix, load_station_matrix, np
+from dashboard.analytics.metrics import network_summary, rebalancing_need, station_metrics
+
+__all__ = [
+    "StationMatrix",
+    "load_station_matrix",
+    "minutes_until",
+    "network_summary",
+    "np",
+    "rebalancing_need",
+    "station_metrics",
+    "train_baselines",
+    "upcoming_rates",
+    "update_baselines",
+]
@@ -0,0 +1,171 @@
+from datetime import timedelta
+
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+
+from dashboard.analytics.matrix import load_station_matrix, np
+from dashboard.models import StationSeasonalBaseline
+
+HOURS_PER_WEEK = 168
+# 1970-01-01 was a Thursday, 72 hours after Monday 00:00
+EPOCH_HOUR_OF_WEEK = 72
+# consecutive scrapes further apart than this (collector outage) carry no
+# usable rate and are left out of the baselines
+MAX_OBSERVATION_GAP = timedelta(minutes=30)
+FORECAST_HORIZON = timedelta(hours=24)
+BASELINE_BATCH_SIZE = 1000
+# 5 parameters per station stay under SQLite's 999 per statement
+BASELINE_UPDATE_BATCH_SIZE = 150
+
+
+def hour_of_week(moment):
+    return (int(moment.timestamp()) // 3600 + EPOCH_HOUR_OF_WEEK) % HOURS_PER_WEEK
+
+
+def update_baselines(scraped_at, observations):
+    """
+    Fold one scrape into the baselines: `observations` holds
+    (station_id, previous scrape time, previous free bikes, free bikes) and
+    every change is credited to the hour of the week of `scraped_at`.
+    The increments are applied in the database (flow = flow + change) so
+    concurrent collectors never overwrite each other's: one insert of the
+    missing rows, then one CASE update per BASELINE_UPDATE_BATCH_SIZE
+    stations.
+    """
+    hour = hour_of_week(scraped_at)
+    deltas = {}
+    for station_id, previous_at, previous_free, free_bikes in observations:
+        elapsed = scraped_at - previous_at
+        if timedelta(0) < elapsed <= MAX_OBSERVATION_GAP:
+            deltas[station_id] = (free_bikes - previous_free, elapsed.total_seconds() / 60)
+    if not deltas:
+        return 0
+
+    StationSeasonalBaseline.objects.bulk_create(
+        [
+            StationSeasonalBaseline(station_id=station_id, hour_of_week=hour, flow=0, minutes=0.0)
+            for station_id in deltas
+        ],
+        batch_size=BASELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    changes = list(deltas.items())
+    for offset in range(0, len(changes), BASELINE_UPDATE_BATCH_SIZE):
+        batch = changes[offset:offset + BASELINE_UPDATE_BATCH_SIZE]
+        StationSeasonalBaseline.objects.filter(
+            hour_of_week=hour, station_id__in=[station_id for station_id, _ in batch]
+        ).update(
+            flow=F("flow") + Case(
+                *(When(station_id=station_id, then=Value(flow)) for station_id, (flow, _) in batch),
+                output_field=IntegerField(),
+            ),
+            minutes=F("minutes") + Case(
+                *(When(station_id=station_id, then=Value(minutes)) for station_id, (_, minutes) in batch),
+                output_field=FloatField(),
+            ),
+        )
+    return len(deltas)
+
+
+def train_baselines(start, end, chunk=timedelta(days=7), step=timedelta(minutes=1)):
+    """
+    Refit every baseline from the snapshots of [start, end), one chunk of
+    station x time matrices at a time. Each snapshot is credited, like on
+    ingest, with its change since the station's previous snapshot (if at
+    most MAX_OBSERVATION_GAP earlier), and the changes are summed per
+    (station, hour of week) with bincount. Replaces the stored baselines;
+    returns the number of rows written.
+    """
+    if np is None:
+        raise RuntimeError("numpy is not installed.")
+
+    flow = minutes = station_ids = None
+    step_minutes = step.total_seconds() / 60
+    max_gap = int(MAX_OBSERVATION_GAP / step)
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + chunk, end)
+        # the leading overlap finds each station's previous snapshot
+        lead = min(max_gap, int((chunk_start - start) / step))
+        matrix = load_station_matrix(chunk_start - lead * step, chunk_end, step)
+        if station_ids is None:
+            station_ids = matrix.station_ids
+            flow = np.zeros(len(station_ids) * HOURS_PER_WEEK)
+            minutes = np.zeros(len(station_ids) * HOURS_PER_WEEK)
+
+        columns = np.arange(matrix.shape[1])
+        last_seen = np.where(matrix.observed, columns, -1)
+        np.maximum.accumulate(last_seen, axis=1, out=last_seen)
+        # column c (c >= 1) against the last snapshot strictly before it
+        previous = last_seen[:, :-1]
+        gap = columns[1:] - previous
+        counted = (
+            matrix.observed[:, 1:] & (previous >= 0) & (gap <= max_gap)
+            & (columns[1:] >= lead)
+        )
+        changes = matrix.free[:, 1:] - matrix.free[:, :-1]
+
+        times = matrix.start.timestamp() + step.total_seconds() * columns[1:]
+        hours = (times // 3600 + EPOCH_HOUR_OF_WEEK).astype(np.int64) % HOURS_PER_WEEK
+        cells = np.arange(len(station_ids))[:, None] * HOURS_PER_WEEK + hours[None, :]
+
+        flow += np.bincount(cells[counted], weights=changes[counted], minlength=flow.size)
+        minutes += np.bincount(cells[counted], weights=gap[counted] * step_minutes, minlength=minutes.size)
+        chunk_start = chunk_end
+
+    rows = [] if station_ids is None else [
+        StationSeasonalBaseline(
+            station_id=int(station_ids[cell // HOURS_PER_WEEK]),
+            hour_of_week=cell % HOURS_PER_WEEK,
+            flow=int(round(flow[cell])),
+            minutes=float(minutes[cell]),
+        )
+        for cell in np.flatnonzero(minutes).tolist()
+    ]
+    StationSeasonalBaseline.objects.all().delete()
+    StationSeasonalBaseline.objects.bulk_create(rows, batch_size=BASELINE_BATCH_SIZE)
+    return len(rows)
+
+
+def upcoming_rates(now, horizon=FORECAST_HORIZON):
+    """
+    {station_id: [bikes per minute for each hour slot from now's onwards]},
+    read in one query; slots without a baseline count as no change.
+    """
+    count = int(horizon / timedelta(hours=1)) + 1
+    first = hour_of_week(now)
+    hours = [(first + k) % HOURS_PER_WEEK for k in range(count)]
+    position = {hour: k for k, hour in enumerate(hours)}
+
+    rates = {}
+    for station_id, hour, flow, minutes in StationSeasonalBaseline.objects.filter(
+        hour_of_week__in=hours
+    ).values_list("station_id", "hour_of_week", "flow", "minutes"):
+        if minutes:
+            rates.setdefault(station_id, [0.0] * count)[position[hour]] = flow / minutes
+    return rates
+
+
+def minutes_until(free_bikes, capacity, rates, now, horizon=FORECAST_HORIZON):
+    """
+    (minutes until empty, minutes until full) when walking the hourly
+    `rates` forward from `free_bikes` at `now`, None for a level not reached
+    within `horizon`.
+    """
+    until_empty = 0 if free_bikes <= 0 else None
+    until_full = 0 if free_bikes >= capacity else None
+    level = float(free_bikes)
+    elapsed = 0.0
+    limit = horizon.total_seconds() / 60
+    segment = 60 - now.minute - now.second / 60
+    for rate in rates:
+        segment = min(segment, limit - elapsed)
+        if segment <= 0:
+            break
+        if until_empty is None and rate < 0 and level / -rate <= segment:
+            until_empty = round(elapsed + level / -rate)
+        if until_full is None and rate > 0 and (capacity - level) / rate <= segment:
+            until_full = round(elapsed + (capacity - level) / rate)
+        level = min(max(level + rate * segment, 0.0), capacity)
+        elapsed += segment
+        segment = 60
+    return until_empty, until_full
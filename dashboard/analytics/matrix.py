@@ -0,0 +1,89 @@
+from itertools import islice
+
+from dashboard.models import Station, StationSnapshot
+
+# NumPy is optional so Django checks/migrations run without it; loading a
+# matrix without it raises
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LOAD_CHUNK_SIZE = 5000
+
+
+class StationMatrix:
+    """
+    Free bikes and empty slots of a set of stations, one row per station
+    (`station_ids`, ascending) and one column per `step` from `start`;
+    `observed` flags the cells holding an actual snapshot.
+    """
+
+    def __init__(self, station_ids, start, step, free, empty, observed):
+        self.station_ids = station_ids
+        self.start = start
+        self.step = step
+        self.free = free
+        self.empty = empty
+        self.observed = observed
+
+    @property
+    def shape(self):
+        return self.free.shape
+
+
+def forward_fill(matrix):
+    """
+    Replace each NaN with the last value to its left in the same row;
+    NaNs before a row's first value stay NaN.
+    """
+    columns = np.arange(matrix.shape[1])
+    last_seen = np.where(np.isnan(matrix), 0, columns)
+    np.maximum.accumulate(last_seen, axis=1, out=last_seen)
+    return matrix[np.arange(matrix.shape[0])[:, None], last_seen]
+
+
+def load_station_matrix(start, end, step, station_ids=None):
+    """
+    Load the snapshots of [start, end) into a StationMatrix. A column holds
+    the last snapshot of its bucket; buckets without one carry the previous
+    value forward, and NaN marks buckets before a station's first snapshot.
+    """
+    if np is None:
+        raise RuntimeError("numpy is not installed.")
+
+    stations = Station.objects.order_by("id")
+    snapshots = StationSnapshot.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if station_ids is not None:
+        stations = stations.filter(id__in=station_ids)
+        snapshots = snapshots.filter(station_id__in=station_ids)
+    ids = np.fromiter(stations.values_list("id", flat=True), dtype=np.int64)
+
+    step_seconds = step.total_seconds()
+    columns = int(-(-(end - start).total_seconds() // step_seconds))
+    free = np.full((len(ids), columns), np.nan)
+    empty = np.full((len(ids), columns), np.nan)
+
+    rows = (
+        snapshots.order_by("timestamp")
+        .values_list("station_id", "timestamp", "free_bikes", "empty_slots")
+        .iterator(chunk_size=LOAD_CHUNK_SIZE)
+    )
+    # one chunk of rows in Python at a time; chunks arrive in time order,
+    # so a later chunk overwrites the cells it shares with an earlier one
+    while chunk := list(islice(rows, LOAD_CHUNK_SIZE)):
+        data = np.array(
+            [(station_id, ts.timestamp(), f, e) for station_id, ts, f, e in chunk],
+            dtype=float,
+        )
+        row = np.searchsorted(ids, data[:, 0].astype(np.int64))
+        col = ((data[:, 1] - start.timestamp()) // step_seconds).astype(np.int64)
+        # keep the last snapshot of every cell
+        cell = row * columns + col
+        _, last_from_end = np.unique(cell[::-1], return_index=True)
+        keep = len(cell) - 1 - last_from_end
+        free[row[keep], col[keep]] = data[keep, 2]
+        empty[row[keep], col[keep]] = data[keep, 3]
+
+    observed = ~np.isnan(free)
+    return StationMatrix(ids, start, step, forward_fill(free), forward_fill(empty), observed)
@@ -0,0 +1,63 @@
+from dashboard.analytics.matrix import np
+
+# Roughly classify_status()'s "ok" band: more than 15% and at most 75% full.
+HEALTHY_FILL = (0.16, 0.75)
+
+
+def station_metrics(matrix):
+    """
+    Per-station metrics of a StationMatrix as arrays aligned with
+    matrix.station_ids (NaN for stations never seen in the window):
+
+    pct_time_empty / pct_time_full: share of observed buckets with no bikes
+    / no free docks; turnover: sum of absolute bucket-to-bucket changes in
+    free bikes; rebalancing_need: bikes to deliver (> 0) or collect (< 0)
+    to bring the latest level into the healthy band.
+    """
+    free, empty = matrix.free, matrix.empty
+    observed = ~np.isnan(free)
+    samples = observed.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct_time_empty = 100 * ((free == 0) & observed).sum(axis=1) / samples
+        pct_time_full = 100 * ((empty == 0) & observed).sum(axis=1) / samples
+
+    turnover = np.nansum(np.abs(np.diff(free, axis=1)), axis=1)
+    turnover[samples == 0] = np.nan
+
+    latest_free = free[:, -1]
+
+    return {
+        "pct_time_empty": pct_time_empty,
+        "pct_time_full": pct_time_full,
+        "turnover": turnover,
+        "rebalancing_need": rebalancing_need(latest_free, latest_free + empty[:, -1]),
+    }
+
+
+def rebalancing_need(free_bikes, capacity):
+    """
+    Bikes to deliver (> 0) or collect (< 0) to bring a station into the
+    healthy band, where capacity is free bikes + empty slots (the docks in
+    service at that scrape). Element-wise on arrays, NaN staying NaN, and
+    also takes plain numbers; shared by the analytics and the tour planner.
+    """
+    low, high = HEALTHY_FILL
+    return (
+        np.maximum(np.ceil(capacity * low) - free_bikes, 0)
+        - np.maximum(free_bikes - np.floor(capacity * high), 0)
+    )
+
+
+def network_summary(metrics):
+    observed = ~np.isnan(metrics["turnover"])
+    count = int(observed.sum())
+    need = metrics["rebalancing_need"]
+    return {
+        "stations_observed": count,
+        "pct_time_empty": float(metrics["pct_time_empty"][observed].mean()) if count else None,
+        "pct_time_full": float(metrics["pct_time_full"][observed].mean()) if count else None,
+        "turnover": float(metrics["turnover"][observed].sum()),
+        "bikes_to_deliver": int(np.nansum(np.where(need > 0, need, 0))),
+        "bikes_to_collect": int(-np.nansum(np.where(need < 0, need, 0))),
+    }
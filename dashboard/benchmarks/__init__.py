@@ -0,0 +1,26 @@
+"""
+Performance harness: seeds synthetic datasets at several scales and
+records latency percentiles, query counts and response sizes of the HTTP
+endpoints and WebSocket consumers, how comment fan-out scales with the
+number of connected sockets, and times the NumPy station metrics
+against a per-station ORM loop. Run it with `manage.py run_benchmarks`.
+"""
+from dashboard.benchmarks.datasets import SCALES, Dataset, seed_dataset
+from dashboard.benchmarks.fanout import FAN_OUT_MESSAGES, comment_fan_out
+from dashboard.benchmarks.measure import measure_http, percentile, summarize
+from dashboard.benchmarks.metrics import compare_station_metrics, orm_loop_metrics
+from dashboard.benchmarks.suite import run_suite
+
+__all__ = [
+    "Dataset",
+    "FAN_OUT_MESSAGES",
+    "SCALES",
+    "comment_fan_out",
+    "compare_station_metrics",
+    "measure_http",
+    "orm_loop_metrics",
+    "percentile",
+    "run_suite",
+    "seed_dataset",
+    "summarize",
+]
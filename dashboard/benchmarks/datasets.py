@@ -0,0 +1,106 @@
+import io
+from datetime import datetime, timedelta, timezone as dt_timezone
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Max
+from django.utils import timezone
+
+from dashboard.models import Comment, Reply, StationCurrentStatus, StationSnapshot, Tour
+
+# a Monday, fixed so reports from different commits describe the same data
+DATASET_START = datetime(2025, 11, 3, tzinfo=dt_timezone.utc)
+SCALES = {
+    "small": {"stations": 50, "days": 2, "interval": 5},
+    "medium": {"stations": 500, "days": 7, "interval": 5},
+    "large": {"stations": 2000, "days": 14, "interval": 5},
+}
+BENCHMARK_COMMENTS = 200
+
+
+class Dataset:
+    """
+    What one seeded scale holds, and the ids the benchmarks drive.
+    """
+
+    def __init__(self, name, scale, user, station_ids, newest_comment_id, tour_id,
+                 snapshots, seed_seconds):
+        self.name = name
+        self.scale = scale
+        self.user = user
+        self.station_ids = station_ids
+        self.newest_comment_id = newest_comment_id
+        self.tour_id = tour_id
+        self.snapshots = snapshots
+        self.seed_seconds = seed_seconds
+
+    @property
+    def start(self):
+        return DATASET_START
+
+    @property
+    def end(self):
+        return DATASET_START + timedelta(days=self.scale["days"])
+
+    def summary(self):
+        return {
+            **self.scale,
+            "snapshots": self.snapshots,
+            "comments": BENCHMARK_COMMENTS,
+            "seed_seconds": round(self.seed_seconds, 1),
+        }
+
+
+def seed_dataset(name, scale):
+    """
+    Empty the database and fill it with `scale` (stations, days, interval
+    in minutes) of synthetic history, the matching current statuses and
+    rollups, a user, and a commented station and a tour to drive.
+    """
+    started = perf_counter()
+    call_command("flush", interactive=False, verbosity=0)
+    call_command(
+        "seed_dummy_snapshots",
+        date=DATASET_START.date().isoformat(),
+        days=scale["days"],
+        interval=scale["interval"],
+        stations=scale["stations"],
+        stdout=io.StringIO(),
+    )
+    # the fixed start date lies outside the raw retention window, but
+    # nothing has pruned this fresh data
+    call_command("rebuild_rollups", ignore_retention=True, stdout=io.StringIO())
+
+    last = StationSnapshot.objects.aggregate(last=Max("timestamp"))["last"]
+    StationCurrentStatus.objects.bulk_create(
+        StationCurrentStatus(station_id=station_id, updated_at=last, free_bikes=free, empty_slots=empty)
+        for station_id, free, empty in StationSnapshot.objects.filter(timestamp=last).values_list(
+            "station_id", "free_bikes", "empty_slots"
+        )
+    )
+
+    user = User.objects.create_user(username="benchmark", password="benchmark", first_name="Bench")
+    station_ids = list(StationCurrentStatus.objects.order_by("station_id").values_list("station_id", flat=True))
+    now = timezone.now()
+    comments = Comment.objects.bulk_create(
+        Comment(commented_to_id=station_ids[0], commentor=user, content=f"Comment {i}",
+                name=user.first_name, creation_time=now - timedelta(minutes=i))
+        for i in range(BENCHMARK_COMMENTS)
+    )
+    Reply.objects.bulk_create(
+        Reply(reply_to=comment, replier=user, content="Noted", name=user.first_name, creation_time=now)
+        for comment in comments
+    )
+    tour = Tour.objects.create(due_date=DATASET_START.date(), assigned_to=user)
+
+    return Dataset(
+        name,
+        scale,
+        user,
+        station_ids,
+        newest_comment_id=Comment.objects.aggregate(newest=Max("id"))["newest"],
+        tour_id=tour.id,
+        snapshots=StationSnapshot.objects.count(),
+        seed_seconds=perf_counter() - started,
+    )
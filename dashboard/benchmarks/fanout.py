@@ -0,0 +1,48 @@
+import asyncio
+from time import perf_counter
+
+from channels.routing import URLRouter
+
+from dashboard import routing
+from dashboard.benchmarks.measure import PERCENTILES, open_socket, percentile
+
+FAN_OUT_MESSAGES = 10
+# generous: with a thousand sockets the last one connects seconds after the first
+FAN_OUT_TIMEOUT = 60
+
+
+async def comment_fan_out(dataset, clients, messages=FAN_OUT_MESSAGES):
+    """
+    Connect `clients` sockets to one station's comments at once, then send
+    `messages` comments and wait for each to reach all of them: the
+    connection-scaling measurement of the sync -> async consumer move.
+    """
+    application = URLRouter(routing.websocket_urlpatterns)
+    path = f"/dashboard/data/{dataset.station_ids[-1]}"
+
+    started = perf_counter()
+    sockets = await asyncio.gather(*(
+        open_socket(application, dataset.user, path, greeting=True, timeout=FAN_OUT_TIMEOUT)
+        for _ in range(clients)
+    ))
+    connect_seconds = perf_counter() - started
+
+    latencies = []
+
+    async def deliver(communicator, sent_at):
+        await communicator.receive_from(timeout=FAN_OUT_TIMEOUT)
+        latencies.append(perf_counter() - sent_at)
+
+    for i in range(messages):
+        sent_at = perf_counter()
+        await sockets[i % clients].send_json_to({"action": "add_comment", "text": f"fan-out {i}"})
+        await asyncio.gather(*(deliver(communicator, sent_at) for communicator in sockets))
+
+    await asyncio.gather(*(communicator.disconnect() for communicator in sockets))
+    latencies.sort()
+    return {
+        "clients": clients,
+        "messages": messages,
+        "connect_all_seconds": round(connect_seconds, 3),
+        "delivery_ms": {f"p{p}": round(percentile(latencies, p) * 1000, 3) for p in PERCENTILES},
+    }
@@ -0,0 +1,105 @@
+import statistics
+from math import ceil
+from time import perf_counter
+
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from dashboard import views
+
+PERCENTILES = (50, 90, 99)
+SOCKET_TIMEOUT = 10
+
+
+def percentile(ordered, p):
+    """
+    Nearest-rank percentile of an ascending list.
+    """
+    return ordered[max(ceil(p / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(samples):
+    """
+    Latency percentiles (ms), median query count and median bytes of
+    (seconds, queries, bytes) samples.
+    """
+    latencies = sorted(seconds for seconds, _, _ in samples)
+    latency_ms = {f"p{p}": round(percentile(latencies, p) * 1000, 3) for p in PERCENTILES}
+    latency_ms["max"] = round(latencies[-1] * 1000, 3)
+    latency_ms["mean"] = round(statistics.fmean(latencies) * 1000, 3)
+    return {
+        "samples": len(samples),
+        "latency_ms": latency_ms,
+        "queries": statistics.median_low(queries for _, queries, _ in samples),
+        "bytes": statistics.median_low(size for _, _, size in samples),
+    }
+
+
+def clear_caches():
+    # the scrape-versioned body cache and this process's grid memo
+    cache.clear()
+    views._station_grids.clear()
+
+
+def measure_http(client, path, params=None, headers=None, repeat=30, cold=False):
+    """
+    Summary of `repeat` GETs after one unmeasured warm-up request; `cold`
+    clears the station caches before every request.
+    """
+    params = params or {}
+    headers = headers or {}
+    client.get(path, params, **headers)
+
+    samples = []
+    statuses = set()
+    for _ in range(repeat):
+        if cold:
+            clear_caches()
+        with CaptureQueriesContext(connection) as ctx:
+            started = perf_counter()
+            response = client.get(path, params, **headers)
+            elapsed = perf_counter() - started
+        statuses.add(response.status_code)
+        samples.append((elapsed, len(ctx.captured_queries), len(response.content)))
+    return {**summarize(samples), "status": sorted(statuses)}
+
+
+# Consumers run their ORM calls through thread-sensitive
+# database_sync_to_async, i.e. on the thread that called async_to_sync,
+# so its connection's query log (kept while a CaptureQueriesContext is
+# open there) counts them.
+
+@sync_to_async
+def reset_queries():
+    connection.queries_log.clear()
+
+
+@sync_to_async
+def count_queries():
+    return len(connection.queries_log)
+
+
+async def open_socket(application, user, path, greeting=False, timeout=SOCKET_TIMEOUT):
+    communicator = WebsocketCommunicator(application, path)
+    communicator.scope["user"] = user
+    connected, _ = await communicator.connect(timeout=timeout)
+    if not connected:
+        raise RuntimeError(f"could not connect to {path}")
+    if greeting:
+        await communicator.receive_from(timeout=timeout)
+    return communicator
+
+
+async def timed(operation):
+    """
+    (seconds, queries, bytes) of awaiting `operation()`, which returns the
+    text frame it waited for.
+    """
+    await reset_queries()
+    started = perf_counter()
+    frame = await operation()
+    elapsed = perf_counter() - started
+    return elapsed, await count_queries(), len(frame.encode())
@@ -0,0 +1,67 @@
+from time import perf_counter
+
+from dashboard import analytics
+from dashboard.models import Station, StationSnapshot
+
+
+def orm_loop_metrics(start, end, step):
+    """
+    {station_id: (pct_time_empty, pct_time_full, turnover) or None}
+    computed the pre-NumPy way: one snapshot query and a Python walk over
+    the buckets per station.
+    """
+    columns = int(-(-(end - start) // step))
+    metrics = {}
+    for station in Station.objects.order_by("id"):
+        buckets = {}
+        for snapshot in StationSnapshot.objects.filter(
+            station=station, timestamp__gte=start, timestamp__lt=end
+        ).order_by("timestamp"):
+            buckets[int((snapshot.timestamp - start) // step)] = (snapshot.free_bikes, snapshot.empty_slots)
+        if not buckets:
+            metrics[station.id] = None
+            continue
+
+        current = previous = None
+        empty = full = observed = turnover = 0
+        for column in range(min(buckets), columns):
+            current = buckets.get(column, current)
+            observed += 1
+            empty += current[0] == 0
+            full += current[1] == 0
+            if previous is not None:
+                turnover += abs(current[0] - previous)
+            previous = current[0]
+        metrics[station.id] = (100 * empty / observed, 100 * full / observed, turnover)
+    return metrics
+
+
+def compare_station_metrics(start, end, step):
+    """
+    Time station_metrics on a StationMatrix against the per-station ORM
+    loop over the same window, after checking both agree.
+    """
+    started = perf_counter()
+    matrix = analytics.load_station_matrix(start, end, step)
+    metrics = analytics.station_metrics(matrix)
+    numpy_seconds = perf_counter() - started
+
+    started = perf_counter()
+    reference = orm_loop_metrics(start, end, step)
+    orm_seconds = perf_counter() - started
+
+    for i, station_id in enumerate(matrix.station_ids.tolist()):
+        expected = reference[station_id]
+        if expected is None:
+            continue
+        found = (metrics["pct_time_empty"][i], metrics["pct_time_full"][i], metrics["turnover"][i])
+        if any(abs(a - b) > 1e-9 for a, b in zip(found, expected)):
+            raise AssertionError(f"station {station_id}: numpy {found} != ORM loop {expected}")
+
+    return {
+        "stations": len(matrix.station_ids),
+        "columns": matrix.shape[1],
+        "numpy_seconds": round(numpy_seconds, 3),
+        "orm_loop_seconds": round(orm_seconds, 3),
+        "speedup": round(orm_seconds / numpy_seconds, 1) if numpy_seconds else None,
+    }
@@ -0,0 +1,170 @@
+import asyncio
+import platform
+import subprocess
+from datetime import timedelta
+from itertools import count
+
+import django
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard import analytics, routing
+from dashboard.benchmarks.datasets import seed_dataset
+from dashboard.benchmarks.fanout import comment_fan_out
+from dashboard.benchmarks.measure import SOCKET_TIMEOUT, measure_http, open_socket, summarize, timed
+from dashboard.benchmarks.metrics import compare_station_metrics
+
+TREND_STATIONS = 20
+TOUR_STOPS = 20
+FAN_OUT_LISTENERS = 20
+
+
+def http_results(dataset, repeat):
+    client = Client()
+    client.force_login(dataset.user)
+    station_id = dataset.station_ids[0]
+    last_day = {"start": (dataset.end - timedelta(days=1)).isoformat(), "end": dataset.end.isoformat()}
+    whole = {"start": dataset.start.isoformat(), "end": dataset.end.isoformat()}
+    trend = reverse("station_trend", args=[station_id])
+    ids = ",".join(str(station_id) for station_id in dataset.station_ids[:TREND_STATIONS])
+
+    requests = {
+        "stations_api": (reverse("stations_api"), {}, {}, False),
+        "stations_api cold": (reverse("stations_api"), {}, {}, True),
+        "stations_api gzip": (reverse("stations_api"), {}, {"HTTP_ACCEPT_ENCODING": "gzip"}, False),
+        "station_detail_api": (reverse("station_detail_api", args=[station_id]), {}, {}, False),
+        "station_trend last day": (trend, last_day, {}, False),
+        "station_trend hour": (trend, {**whole, "granularity": "hour"}, {}, False),
+        "station_trend day": (trend, {**whole, "granularity": "day"}, {}, False),
+        "stations_trend hour": (reverse("stations_trend"), {**whole, "ids": ids, "granularity": "hour"}, {}, False),
+        "station_comments_api": (reverse("station_comments_api", args=[station_id]), {}, {}, False),
+    }
+    if analytics.np is not None:
+        requests["network_analytics last day"] = (reverse("network_analytics"), last_day, {}, False)
+    return {
+        name: measure_http(client, path, params, headers, repeat=repeat, cold=cold)
+        for name, (path, params, headers, cold) in requests.items()
+    }
+
+
+async def websocket_results(dataset, repeat):
+    application = URLRouter(routing.websocket_urlpatterns)
+    user = dataset.user
+    station_path = f"/dashboard/data/{dataset.station_ids[0]}"
+    samples = {}
+
+    async def connect_comments():
+        communicator = await open_socket(application, user, station_path)
+        frame = await communicator.receive_from(timeout=SOCKET_TIMEOUT)
+        await communicator.disconnect()
+        return frame
+    samples["comments connect"] = [await timed(connect_comments) for _ in range(repeat)]
+
+    listeners = [
+        await open_socket(application, user, station_path, greeting=True)
+        for _ in range(FAN_OUT_LISTENERS)
+    ]
+    sender = listeners[0]
+
+    async def load_comments():
+        await sender.send_json_to({"action": "load_comments", "before": dataset.newest_comment_id})
+        return await sender.receive_from(timeout=SOCKET_TIMEOUT)
+    samples["comments load_comments"] = [await timed(load_comments) for _ in range(repeat)]
+
+    async def add_comment():
+        await sender.send_json_to({"action": "add_comment", "text": "benchmark"})
+        frames = await asyncio.gather(*(
+            listener.receive_from(timeout=SOCKET_TIMEOUT) for listener in listeners
+        ))
+        return frames[0]
+    samples[f"comments add_comment x{FAN_OUT_LISTENERS}"] = [await timed(add_comment) for _ in range(repeat)]
+
+    overview = await open_socket(application, user, "/dashboard/tour")
+    watcher = await open_socket(application, user, f"/dashboard/tour/{dataset.tour_id}")
+    tour = {
+        "action": "create_tour_bulk",
+        "date": dataset.start.date().isoformat(),
+        "user": user.username,
+        "stops": [
+            {"station_id": station_id, "tasks": ["Check docks"]}
+            for station_id in dataset.station_ids[:TOUR_STOPS]
+        ],
+    }
+
+    async def create_tour_bulk():
+        await overview.send_json_to(tour)
+        return await overview.receive_from(timeout=SOCKET_TIMEOUT)
+    samples[f"tour create_tour_bulk x{TOUR_STOPS}"] = [await timed(create_tour_bulk) for _ in range(repeat)]
+
+    order = count(1)
+
+    async def add_stop():
+        await watcher.send_json_to({
+            "action": "add_stop", "tour_id": dataset.tour_id,
+            "station_id": dataset.station_ids[0], "order": next(order),
+        })
+        return await watcher.receive_from(timeout=SOCKET_TIMEOUT)
+    samples["tour add_stop"] = [await timed(add_stop) for _ in range(repeat)]
+
+    for communicator in listeners + [overview, watcher]:
+        await communicator.disconnect()
+    return {name: summarize(runs) for name, runs in samples.items()}
+
+
+def git_revision():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run_suite(scales, repeat=30, log=None, fan_out=()):
+    """
+    Seed every scale in turn ({name: {"stations", "days", "interval"}})
+    and benchmark the HTTP endpoints and WebSocket consumers against it,
+    plus (with NumPy) the station metrics of its last day against the ORM
+    loop and comment fan-out to each client count in `fan_out`. Returns
+    the JSON-ready report.
+    """
+    report = {
+        "meta": {
+            "commit": git_revision(),
+            "created": timezone.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "cache": settings.CACHES["default"]["BACKEND"],
+            "channel_layer": settings.CHANNEL_LAYERS["default"]["BACKEND"],
+            "repeat": repeat,
+        },
+        "scales": {},
+    }
+    for name, scale in scales.items():
+        dataset = seed_dataset(name, scale)
+        if log:
+            log(f"{name}: {dataset.snapshots} snapshots seeded in {dataset.seed_seconds:.1f}s")
+        http = http_results(dataset, repeat)
+        with CaptureQueriesContext(connection):
+            websocket = async_to_sync(websocket_results)(dataset, repeat)
+        report["scales"][name] = {"dataset": dataset.summary(), "http": http, "websocket": websocket}
+        if analytics.np is not None:
+            report["scales"][name]["station_metrics"] = compare_station_metrics(
+                dataset.end - timedelta(days=1), dataset.end, timedelta(minutes=scale["interval"])
+            )
+        if fan_out:
+            report["scales"][name]["fan_out"] = [
+                async_to_sync(comment_fan_out)(dataset, clients) for clients in fan_out
+            ]
+        if log:
+            log(f"{name}: done")
+    return report
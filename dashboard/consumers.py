@@ -1,236 +1,469 @@
-from channels.generic.websocket import WebsocketConsumer
-from asgiref.sync import async_to_sync
+from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.db import database_sync_to_async
 from dashboard.models import Comment, Station, Reply, Tour, Stop, Task
 import json
+from django.contrib.auth.models import User
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 
-class CommentConsumer(WebsocketConsumer):
-    group_name = 'dashboard_chat_group'
-    channel_name = 'dashboard_chat_channel'
+MAX_TOUR_STOPS = 500
+MAX_COMMENT_LENGTH = 200  # Comment.content and Reply.content
+MAX_TASK_LENGTH = 400  # Task.content
 
-    user = None
 
-    def connect(self):
-        async_to_sync(self.channel_layer.group_add)(
-            self.group_name, self.channel_name
-        )
+# Groups are hierarchical: 'station' reaches every overview map while
+# 'station.<id>' reaches only clients looking at that station; the same
+# goes for 'tour' and 'tour.<id>'.
+
+def station_group(station_id=None):
+    return 'station' if station_id is None else f'station.{station_id}'
+
+
+def tour_group(tour_id=None):
+    return 'tour' if tour_id is None else f'tour.{tour_id}'
+
+
+def is_id(value):
+    # JSON true/false decode to bool, a subclass of int
+    return type(value) is int and 0 < value < 2 ** 63
+
 
-        self.accept()
+def clean_text(value, max_length):
+    # the stripped text, or None unless it is a non-empty string that fits
+    text = value.strip() if isinstance(value, str) else ''
+    return text if 0 < len(text) <= max_length else None
+
+
+def parse_day(value):
+    # parse_date returns None for malformed strings but raises on
+    # impossible dates such as 2025-02-30
+    try:
+        return parse_date(value) if isinstance(value, str) else None
+    except ValueError:
+        return None
+
+
+def is_stop_order(value):
+    # PositiveIntegerField: the smallest range any database gives it
+    return type(value) is int and 0 < value < 2 ** 31
+
+
+# Consumers run on the event loop; every ORM call goes through
+# database_sync_to_async so only DB work takes a thread.
+
+class CommentConsumer(AsyncWebsocketConsumer):
+    page_size = 20
+
+    user = None
+    station_id = None
+    group_name = None
+
+    async def connect(self):
+        await self.accept()
 
         if not self.scope["user"].is_authenticated:
-            self.send_error(f'You must be logged in')
-            self.close()
+            await self.send_error(f'You must be logged in')
+            await self.close()
+            return
+
+        station_id = self.scope["url_route"]["kwargs"]["station_id"]
+        if not await self.station_exists(station_id):
+            await self.send_error('station does not exist')
+            await self.close()
             return
-        
+
         self.user = self.scope["user"]
+        self.station_id = station_id
+        self.group_name = station_group(self.station_id)
 
-        self.broadcast_comment()
-        self.broadcast_reply()
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
 
-    def disconnect(self, close_code):
-        async_to_sync(self.channel_layer.group_discard)(
-            self.group_name, self.channel_name
-        )
-    
-    def receive(self, **kwargs):
-        print("in recieve")
-        if 'text_data' not in kwargs:
-            self.send_error('you must send text_data')
+        await self.send_comment_page()
+
+    async def disconnect(self, close_code):
+        if self.group_name is None:
             return
-        
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if text_data is None:
+            await self.send_error('you must send text_data')
+            return
+
         try:
-            data = json.loads(kwargs['text_data'])
-        except json.JSONDecoder:
-            self.send_error('invalid JSON sent to server')
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            await self.send_error('invalid JSON sent to server')
             return
 
         if 'action' not in data:
-            self.send_error('action property not sent in JSON')
+            await self.send_error('action property not sent in JSON')
             return
 
         action = data['action']
 
         if action == 'add_comment':
-            self.received_add_comment(data)
+            await self.received_add_comment(data)
             return
-        
+
         if action == 'add_reply':
-            self.received_add_reply(data)
+            await self.received_add_reply(data)
             return
-        
-    def received_add_comment(self, data):
+
+        if action == 'load_comments':
+            before = data.get('before')
+            if before is not None and not is_id(before):
+                await self.send_error('"before" must be a comment id')
+                return
+            await self.send_comment_page(before=before)
+            return
+
+    async def received_add_comment(self, data):
         if 'text' not in data:
-            self.send_error('"text" property not sent in JSON')
+            await self.send_error('"text" property not sent in JSON')
             return
-        
-        text = data['text']
-        stationId = data['id']
-        station = Station.objects.filter(id=stationId).first()
-        new_comment = Comment(commented_to=station, commentor=self.user, content=text, name = self.user.first_name, creation_time=timezone.now())
-        new_comment.save()
-        
-        self.broadcast_comment()
 
-    def received_add_reply(self, data):
+        text = clean_text(data['text'], MAX_COMMENT_LENGTH)
+        if text is None:
+            await self.send_error(f'"text" must be 1 to {MAX_COMMENT_LENGTH} characters')
+            return
+
+        comment = await self.create_comment(text)
+        await self.broadcast_comment(comment)
+
+    async def received_add_reply(self, data):
         if 'text' not in data:
-            self.send_error('"text" property not sent in JSON')
+            await self.send_error('"text" property not sent in JSON')
+            return
+
+        text = clean_text(data['text'], MAX_COMMENT_LENGTH)
+        if text is None:
+            await self.send_error(f'"text" must be 1 to {MAX_COMMENT_LENGTH} characters')
+            return
+
+        if not is_id(data.get('id')):
+            await self.send_error('"id" must be a comment id')
             return
-        
-        text = data['text']
-        commentId = data['id']
-        comment = Comment.objects.filter(id=commentId).first()
+
+        reply = await self.create_reply(data['id'], text)
+        if reply is None:
+            await self.send_error('comment does not exist')
+            return
+
+        await self.broadcast_reply(reply)
+
+    @database_sync_to_async
+    def station_exists(self, station_id):
+        return Station.objects.filter(id=station_id).exists()
+
+    @database_sync_to_async
+    def create_comment(self, text):
+        new_comment = Comment(commented_to_id=self.station_id, commentor=self.user, content=text, name = self.user.first_name, creation_time=timezone.now())
+        new_comment.save()
+        return Comment.make_comment_list(Comment.objects.filter(pk=new_comment.pk))[0]
+
+    @database_sync_to_async
+    def create_reply(self, comment_id, text):
+        comment = Comment.objects.filter(id=comment_id, commented_to_id=self.station_id).first()
+        if comment is None:
+            return None
         new_reply = Reply(reply_to=comment, replier=self.user, content=text, name = self.user.first_name, creation_time=timezone.now())
         new_reply.save()
-        
-        self.broadcast_reply()
-    
-    def broadcast_comment(self):
-        async_to_sync(self.channel_layer.group_send)(
+        return Reply.make_reply_list(Reply.objects.filter(pk=new_reply.pk))[0]
+
+    @database_sync_to_async
+    def comment_page(self, before=None):
+        """
+        One page of this station's comments (newest first, walking back
+        from comment id `before`) together with their replies.
+        """
+        comment_ids = Comment.objects.filter(commented_to_id=self.station_id).order_by('-id')
+        if before is not None:
+            comment_ids = comment_ids.filter(id__lt=before)
+        comment_ids = list(comment_ids.values_list('id', flat=True)[:self.page_size + 1])
+        has_more = len(comment_ids) > self.page_size
+        comment_ids = comment_ids[:self.page_size]
+
+        comments = Comment.objects.filter(id__in=comment_ids).order_by('id')
+        replies = Reply.objects.filter(reply_to_id__in=comment_ids).order_by('id')
+
+        return {
+            'action': 'comments',
+            'comments': Comment.make_comment_list(comments),
+            'replies': Reply.make_reply_list(replies),
+            'has_more': has_more,
+        }
+
+    async def send_comment_page(self, before=None):
+        page = await self.comment_page(before)
+        await self.send(text_data=json.dumps(page))
+
+    async def broadcast_comment(self, comment):
+        await self.channel_layer.group_send(
             self.group_name,
             {
                 'type': 'broadcast_event',
-                'message': json.dumps(Comment.make_comment_list())
+                'message': json.dumps({'action': 'comment_added', 'comment': comment})
             }
         )
-    
-    def broadcast_reply(self):
-        async_to_sync(self.channel_layer.group_send)(
+
+    async def broadcast_reply(self, reply):
+        await self.channel_layer.group_send(
             self.group_name,
             {
                 'type': 'broadcast_event',
-                'message': json.dumps(Reply.make_reply_list())
+                'message': json.dumps({'action': 'reply_added', 'reply': reply})
             }
         )
 
-    def broadcast_event(self, event):
-        self.send(text_data=event['message'])
-    
+    async def broadcast_event(self, event):
+        await self.send(text_data=event['message'])
 
-class TourConsumer(WebsocketConsumer):
-    group_name = 'dashboard_tour_group'
-    channel_name = 'dashboard_tour_channel'
+    async def send_error(self, error_message):
+        await self.send(text_data=json.dumps({'error': error_message}))
 
-    user = None
 
-    def connect(self):
-        async_to_sync(self.channel_layer.group_add)(
-            self.group_name, self.channel_name
-        )
+class TourConsumer(AsyncWebsocketConsumer):
+    user = None
+    group_name = None
 
-        self.accept()
+    async def connect(self):
+        await self.accept()
 
         if not self.scope["user"].is_authenticated:
-            self.send_error(f'You must be logged in')
-            self.close()
+            await self.send_error(f'You must be logged in')
+            await self.close()
             return
-        
+
         self.user = self.scope["user"]
-    
-    def disconnect(self, close_code):
-        async_to_sync(self.channel_layer.group_discard)(
-            self.group_name, self.channel_name
-        )
-    
-    def receive(self, **kwargs):
-        if 'text_data' not in kwargs:
-            self.send_error('you must send text_data')
+        self.group_name = tour_group(self.scope["url_route"]["kwargs"].get("tour_id"))
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+
+    async def disconnect(self, close_code):
+        if self.group_name is None:
             return
-        
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if text_data is None:
+            await self.send_error('you must send text_data')
+            return
+
         try:
-            data = json.loads(kwargs['text_data'])
-        except json.JSONDecoder:
-            self.send_error('invalid JSON sent to server')
+            data = json.loads(text_data)
+        except json.JSONDecodeError:
+            await self.send_error('invalid JSON sent to server')
             return
 
         if 'action' not in data:
-            self.send_error('action property not sent in JSON')
+            await self.send_error('action property not sent in JSON')
             return
 
         action = data['action']
 
         if action == 'create_tour':
-            self.received_create_tour(data)
+            await self.received_create_tour(data)
             return
-        
+
         if action == 'add_stop':
-            self.received_add_stop(data)
+            await self.received_add_stop(data)
             return
-        
+
         if action == 'add_task':
-            self.received_add_task(data)
+            await self.received_add_task(data)
             return
-    
-    def received_create_tour(self,data):
 
-        if (('date' not in data) and ('user' not in data)):
-            self.send_error('missing json properties')
+        if action == 'create_tour_bulk':
+            await self.received_create_tour_bulk(data)
+            return
+
+    async def received_create_tour(self,data):
+
+        if any(key not in data for key in ('date', 'user')):
+            await self.send_error('missing json properties')
+            return
+
+        tour = await self.create_tour(data['date'], data['user'])
+        if tour is None:
+            await self.send_error('invalid date or unknown user')
             return
-        
-        date = data['date']
-        user = data['user']
-        
-        new_tour = Tour(due_date=date, assigned_to=user)
-        new_tour.save()
 
-        return
-    
-    def received_add_stop(self,data):
+        await self.broadcast_change(tour_group(), 'tour_created', 'tour', tour)
 
-        if (('tour_id' not in data) and ('station_id' not in data) and ('order' not in data)):
-            self.send_error('missing json properties')
+    async def received_add_stop(self,data):
+
+        if any(key not in data for key in ('tour_id', 'station_id', 'order')):
+            await self.send_error('missing json properties')
+            return
+
+        if not (is_id(data['tour_id']) and is_id(data['station_id'])):
+            await self.send_error('"tour_id" and "station_id" must be ids')
+            return
+
+        if not is_stop_order(data['order']):
+            await self.send_error('"order" must be a positive integer')
+            return
+
+        stop = await self.create_stop(data['tour_id'], data['station_id'], data['order'])
+        if stop is None:
+            await self.send_error('tour or station does not exist')
             return
-        
-        tour_id = data['tour_id']
-        station_id = data['station_id']
-        order = data['order']
 
+        await self.broadcast_change(tour_group(data['tour_id']), 'stop_added', 'stop', stop)
+
+    async def received_add_task(self, data):
+
+        if any(key not in data for key in ('stop_id', 'text')):
+            await self.send_error('missing json properties')
+            return
+
+        if not is_id(data['stop_id']):
+            await self.send_error('"stop_id" must be a stop id')
+            return
+
+        text = clean_text(data['text'], MAX_TASK_LENGTH)
+        if text is None:
+            await self.send_error(f'"text" must be 1 to {MAX_TASK_LENGTH} characters')
+            return
+
+        created = await self.create_task(data['stop_id'], text)
+        if created is None:
+            await self.send_error('stop does not exist')
+            return
+
+        tour_id, task = created
+        await self.broadcast_change(tour_group(tour_id), 'task_added', 'task', task)
+
+    async def received_create_tour_bulk(self, data):
+        """
+        A whole tour in one message:
+        {"date": "YYYY-MM-DD", "user": "<username>",
+         "stops": [{"station_id": 1, "tasks": ["Deliver 4 bikes"]}, ...]}
+        with stops in visiting order.
+        """
+        try:
+            tour = await self.create_tour_bulk(data)
+        except ValueError as exc:
+            await self.send_error(str(exc))
+            return
+
+        await self.broadcast_change(tour_group(), 'tour_changed', 'tour', tour)
+
+    @database_sync_to_async
+    def create_tour(self, date, username):
+        due_date = parse_day(date)
+        assignee = User.objects.filter(username=username).first()
+        if due_date is None or assignee is None:
+            return None
+
+        new_tour = Tour(due_date=due_date, assigned_to=assignee)
+        new_tour.save()
+        return Tour.make_tour_list(Tour.objects.filter(pk=new_tour.pk))[0]
+
+    @database_sync_to_async
+    def create_stop(self, tour_id, station_id, order):
         tour = Tour.objects.filter(id=tour_id).first()
         station = Station.objects.filter(id=station_id).first()
+        if tour is None or station is None:
+            return None
 
         new_stop = Stop(tour=tour, station=station, order=order)
         new_stop.save()
+        return Stop.make_stop_list(Stop.objects.filter(pk=new_stop.pk))[0]
 
-        return 
-    
-    def received_add_task(self, data):
-
-        if (('stop_id' not in data) and ('text' not in data)):
-            self.send_error('missing json properties')
-            return
-        
-        stop_id = data['stop_id']
-        content = data['text']
-
+    @database_sync_to_async
+    def create_task(self, stop_id, content):
         stop = Stop.objects.filter(id=stop_id).first()
+        if stop is None:
+            return None
 
         new_task = Task(stop=stop, content=content)
         new_task.save()
+        return stop.tour_id, Task.make_task_list(Task.objects.filter(pk=new_task.pk))[0]
 
-        return
-    
-    def broadcast_tour(self):
-        async_to_sync(self.channel_layer.group_send)(
-            self.group_name,
-            {
-                'type': 'broadcast_event',
-                'message': json.dumps(Tour.make_tour_list())
-            }
-        )
-    
-    def broadcast_stop(self):
-        async_to_sync(self.channel_layer.group_send)(
-            self.group_name,
+    @database_sync_to_async
+    def create_tour_bulk(self, data):
+        """
+        Validate a create_tour_bulk message (raising ValueError with the
+        client-facing reason) and write the tour, its stops and their tasks
+        in one transaction with a fixed number of queries.
+        """
+        due_date = parse_day(data.get('date'))
+        if due_date is None:
+            raise ValueError('"date" must be YYYY-MM-DD')
+
+        stops = data.get('stops')
+        if not isinstance(stops, list) or not 0 < len(stops) <= MAX_TOUR_STOPS:
+            raise ValueError(f'"stops" must list 1 to {MAX_TOUR_STOPS} stops')
+        for stop in stops:
+            tasks = stop.get('tasks', []) if isinstance(stop, dict) else None
+            if (
+                not isinstance(stop, dict)
+                or not is_id(stop.get('station_id'))
+                or not isinstance(tasks, list)
+                or not all(isinstance(text, str) and 0 < len(text) <= MAX_TASK_LENGTH for text in tasks)
+            ):
+                raise ValueError('every stop needs a "station_id" and a list of "tasks" texts')
+
+        assignee = User.objects.filter(username=data.get('user')).first()
+        if assignee is None:
+            raise ValueError('unknown user')
+        station_ids = {stop['station_id'] for stop in stops}
+        if Station.objects.filter(id__in=station_ids).count() != len(station_ids):
+            raise ValueError('station does not exist')
+
+        with transaction.atomic():
+            tour = Tour.objects.create(due_date=due_date, assigned_to=assignee)
+            new_stops = Stop.objects.bulk_create(
+                Stop(tour=tour, station_id=stop['station_id'], order=order)
+                for order, stop in enumerate(stops, start=1)
+            )
+            new_tasks = Task.objects.bulk_create(
+                Task(stop=new_stop, content=text)
+                for new_stop, stop in zip(new_stops, stops)
+                for text in stop.get('tasks', [])
+            )
+
+        return {
+            'id': tour.id,
+            'due_date': due_date.isoformat(),
+            'assigned_to': assignee.first_name,
+            'stops': len(new_stops),
+            'tasks': len(new_tasks),
+        }
+
+    async def broadcast_change(self, group_name, action, key, row):
+        await self.channel_layer.group_send(
+            group_name,
             {
                 'type': 'broadcast_event',
-                'message': json.dumps(Stop.make_stop_list())
+                'message': json.dumps({'action': action, key: row})
             }
         )
-    
-    def broadcast_task(self):
-        async_to_sync(self.channel_layer.group_send)(
-            self.group_name,
-            {
-                'type': 'broadcast_event',
-                'message': json.dumps(Task.make_task_list())
-            }
-        )
\ No newline at end of file
+
+    async def broadcast_event(self, event):
+        await self.send(text_data=event['message'])
+
+    async def send_error(self, error_message):
+        await self.send(text_data=json.dumps({'error': error_message}))
+
+class StationStatusConsumer(AsyncWebsocketConsumer):
+    group_name = station_group()
+
+    async def connect(self):
+        await self.accept()
+
+        if not self.scope["user"].is_authenticated:
+            await self.send(text_data=json.dumps({'error': 'You must be logged in'}))
+            await self.close()
+            return
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+
+    async def disconnect(self, close_code):
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def broadcast_event(self, event):
+        await self.send(text_data=event['message'])
@@ -0,0 +1,121 @@
+import json
+import re
+
+from django.http import HttpResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+
+# MessagePack and Brotli are optional; without them the format / encoding
+# is simply not offered
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON = "application/json"
+# Columnar JSON: one array per field instead of one object per row, with
+# timestamps as epoch seconds delta-encoded against the previous entry.
+COLUMNAR = "application/vnd.pogoh.columnar+json"
+# The columnar payload, MessagePack-encoded.
+MSGPACK = "application/msgpack"
+
+MEDIA_TYPE_TAGS = {JSON: "json", COLUMNAR: "columnar", MSGPACK: "msgpack"}
+
+# Brotli's 0-11 scale; 5 is close to gzip's speed at a smaller size
+BROTLI_QUALITY = 5
+accepts_brotli = re.compile(r"\bbr\b")
+
+
+def offered_media_types():
+    return [JSON, COLUMNAR] + ([MSGPACK] if msgpack is not None else [])
+
+
+def negotiate(request):
+    """
+    Media type to answer `request` with: plain JSON unless its Accept header
+    prefers one of the compact formats.
+    """
+    return request.get_preferred_type(offered_media_types()) or JSON
+
+
+def columns(rows, keys):
+    return {key: [row[key] for row in rows] for key in keys}
+
+
+def epoch_seconds(moment):
+    return int(moment.timestamp())
+
+
+def delta_encode(values):
+    """
+    [a, b, c] -> [a, b - a, c - b]; regular series become runs of one
+    repeated step that compress to almost nothing.
+    """
+    encoded = []
+    previous = 0
+    for value in values:
+        encoded.append(value - previous)
+        previous = value
+    return encoded
+
+
+def delta_decode(values):
+    decoded = []
+    total = 0
+    for value in values:
+        total += value
+        decoded.append(total)
+    return decoded
+
+
+def encode(payload, media_type):
+    if media_type == MSGPACK:
+        return msgpack.packb(payload)
+    return json.dumps(payload, separators=(",", ":") if media_type == COLUMNAR else None)
+
+
+def encoded_response(body, media_type):
+    response = HttpResponse(body, content_type=media_type)
+    patch_vary_headers(response, ("Accept",))
+    return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware that answers with Brotli instead when the client accepts
+    it and the brotli package is installed.
+    """
+
+    def process_response(self, request, response):
+        if (
+            brotli is None
+            or response.streaming
+            or len(response.content) < 200
+            or response.has_header("Content-Encoding")
+            or not accepts_brotli.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+
+        # same weak-ETag rule as GZipMiddleware
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
+
+
+# per-view compression, so HTML pages carrying CSRF tokens stay uncompressed
+compress_response = decorator_from_middleware(CompressionMiddleware)
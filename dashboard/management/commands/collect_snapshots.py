@@ -1,9 +1,53 @@
+import asyncio
+from time import perf_counter
+
+from channels.layers import InMemoryChannelLayer, get_channel_layer
 from django.core.management.base import BaseCommand
-from dashboard.views import set_station_status_log
+from dashboard.collector import SnapshotCollector
+from dashboard.views import fetch_data, ingest_station_statuses
 
 class Command(BaseCommand):
     help = "Fetch current CityBikes data and store StationSnapshot rows."
 
-    def handle(self, *args, **opts):
-        set_station_status_log()
-        self.stdout.write(self.style.SUCCESS("snapshots collected"))
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--daemon",
+            action="store_true",
+            help="Keep polling instead of collecting a single scrape.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60,
+            help="Seconds between polls in --daemon mode (default 60).",
+        )
+
+    def handle(self, *args, daemon=False, interval=60, **opts):
+        if daemon:
+            self.run_daemon(interval)
+            return
+
+        data = fetch_data()
+
+        started = perf_counter()
+        stored = ingest_station_statuses(data["network"]["stations"])
+        elapsed = perf_counter() - started
+
+        rate = stored / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"snapshots collected: {stored} stations in {elapsed:.3f}s ({rate:.0f} rows/s)"
+        ))
+
+    def run_daemon(self, interval):
+        if isinstance(get_channel_layer(), InMemoryChannelLayer):
+            self.stdout.write(self.style.WARNING(
+                "in-memory channel layer: station deltas will not reach the web "
+                "workers; set DASHBOARD_CHANNEL_LAYER=redis"
+            ))
+
+        collector = SnapshotCollector(interval=interval, log=self.stdout.write)
+        self.stdout.write(f"polling {collector.url} every {interval:g}s")
+        try:
+            asyncio.run(collector.run())
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS("collector stopped"))
@@ -0,0 +1,55 @@
+from datetime import date
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import rebalancing
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a Tour visiting every station outside the healthy fill band, "
+        "with stops ordered by nearest neighbour + 2-opt."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="Dispatcher the tour is assigned to.")
+        parser.add_argument(
+            "--date",
+            type=str,
+            help="YYYY-MM-DD due date. Defaults to today.",
+        )
+        parser.add_argument(
+            "--max-stops",
+            type=int,
+            help="Only visit the most urgent N stations.",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=float,
+            default=rebalancing.TWO_OPT_TIME_BUDGET,
+            help=f"Seconds spent optimizing the route (default {rebalancing.TWO_OPT_TIME_BUDGET}).",
+        )
+
+    def handle(self, *args, username, date=None, max_stops=None, time_budget=None, **opts):
+        if rebalancing.np is None:
+            raise CommandError("numpy is not installed.")
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise CommandError(f"no user named {username!r}")
+
+        started = perf_counter()
+        tour = rebalancing.plan_rebalancing_tour(
+            self._date(date), user, max_stops=max_stops, time_budget=time_budget
+        )
+        if tour is None:
+            self.stdout.write("every station is within the healthy band; no tour created")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"tour {tour.id}: {tour.stop_set.count()} stops planned in {perf_counter() - started:.2f}s"
+        ))
+
+    @staticmethod
+    def _date(day_str):
+        return date.fromisoformat(day_str) if day_str else date.today()
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from time import perf_counter, sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard.models import (
+    StationDailyRollup,
+    StationHourlyRollup,
+    StationSnapshot,
+)
+
+
+class Command(BaseCommand):
+    help = "Delete time-series rows older than the SNAPSHOT_RETENTION_DAYS policy."
+
+    def add_arguments(self, parser):
+        policy = settings.SNAPSHOT_RETENTION_DAYS
+        for tier in ("raw", "hourly", "daily"):
+            parser.add_argument(
+                f"--{tier}-days",
+                type=int,
+                default=policy.get(tier),
+                help=f"Keep {tier} rows this many days (default {policy.get(tier)}).",
+            )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows deleted per transaction (default 5000).",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.05,
+            help="Seconds to sleep between batches so ingest can take the write lock.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count what would be deleted.",
+        )
+
+    def handle(self, *args, raw_days=None, hourly_days=None, daily_days=None,
+               batch_size=5000, pause=0.05, dry_run=False, **opts):
+        now = timezone.now()
+        raw = hourly = daily = None
+        if raw_days is not None:
+            raw = now - timedelta(days=raw_days)
+        if hourly_days is not None:
+            hourly = now - timedelta(days=hourly_days)
+        if daily_days is not None:
+            daily = now - timedelta(days=daily_days)
+
+        # (label, model, age column, cutoff or None to keep everything)
+        targets = [
+            ("snapshots", StationSnapshot, "timestamp", raw),
+            ("hourly rollups", StationHourlyRollup, "bucket", hourly),
+            ("daily rollups", StationDailyRollup, "bucket", daily),
+        ]
+
+        total = 0
+        for label, model, column, expires_before in targets:
+            if expires_before is None:
+                self.stdout.write(f"{label}: kept forever")
+                continue
+
+            started = perf_counter()
+            if dry_run:
+                removed, batches = model.objects.filter(**{f"{column}__lt": expires_before}).count(), 0
+            else:
+                removed, batches = self.delete_in_batches(model, column, expires_before, batch_size, pause)
+            total += removed
+            self.stdout.write(
+                f"{label}: {removed} rows {'would be ' if dry_run else ''}removed "
+                f"in {batches} batches, {perf_counter() - started:.2f}s"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{total} rows pruned"))
+
+    @staticmethod
+    def delete_in_batches(model, column, expires_before, batch_size, pause):
+        """
+        Delete rows older than `expires_before` by primary-key batches; each
+        batch commits on its own so no single write lock is held for the
+        whole purge. Batches walk the age column so its index is used.
+        """
+        removed = batches = 0
+        while True:
+            ids = list(
+                model.objects.filter(**{f"{column}__lt": expires_before})
+                .order_by(column)
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                return removed, batches
+            removed += model.objects.filter(pk__in=ids).delete()[0]
+            batches += 1
+            if pause:
+                sleep(pause)
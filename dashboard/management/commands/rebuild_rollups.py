@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from dashboard.models import StationDailyRollup, StationHourlyRollup, StationSnapshot
+from dashboard.rollups import day_floor, rebuild_daily, rebuild_hourly
+
+
+class Command(BaseCommand):
+    help = "Recompute hourly and daily StationSnapshot rollups from raw snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            type=str,
+            help="YYYY-MM-DD (UTC). Defaults to the oldest snapshot.",
+        )
+        parser.add_argument(
+            "--end",
+            type=str,
+            help="YYYY-MM-DD (UTC), exclusive. Defaults to the day after the newest snapshot.",
+        )
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=7,
+            help="Days recomputed per transaction (default 7).",
+        )
+        parser.add_argument(
+            "--ignore-retention",
+            action="store_true",
+            help=(
+                "Also rebuild days before the raw retention window. Only safe "
+                "when prune_snapshots never ran on them."
+            ),
+        )
+
+    @staticmethod
+    def _day(day_str):
+        return datetime.fromisoformat(day_str).replace(tzinfo=dt_timezone.utc)
+
+    @staticmethod
+    def _first_unpruned_day():
+        """
+        Start of the first whole day prune_snapshots has not touched, or
+        None when raw snapshots are kept forever.
+        """
+        raw_days = settings.SNAPSHOT_RETENTION_DAYS.get("raw")
+        if raw_days is None:
+            return None
+        pruned_before = timezone.now() - timedelta(days=raw_days)
+        day = day_floor(pruned_before)
+        return day if day == pruned_before else day + timedelta(days=1)
+
+    def handle(self, *args, start=None, end=None, chunk_days=7, ignore_retention=False, **opts):
+        bounds = StationSnapshot.objects.aggregate(first=Min("timestamp"), last=Max("timestamp"))
+        if bounds["first"] is None:
+            self.stdout.write("no snapshots to roll up")
+            return
+
+        start = self._day(start) if start else day_floor(bounds["first"])
+        end = self._day(end) if end else day_floor(bounds["last"]) + timedelta(days=1)
+
+        # rollups outlive raw snapshots: rebuilding a (partly) pruned day
+        # would replace its rollups with ones computed from what is left
+        first_unpruned = None if ignore_retention else self._first_unpruned_day()
+        if first_unpruned is not None and start < first_unpruned:
+            self.stdout.write(f"keeping rollups before {first_unpruned.date()}: their snapshots may be pruned")
+            start = first_unpruned
+        if start >= end:
+            self.stdout.write("nothing to rebuild inside the raw retention window")
+            return
+
+        started = perf_counter()
+        hourly = daily = 0
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days), end)
+            with transaction.atomic():
+                # drop buckets whose snapshots have since disappeared
+                StationHourlyRollup.objects.filter(bucket__gte=chunk_start, bucket__lt=chunk_end).delete()
+                StationDailyRollup.objects.filter(bucket__gte=chunk_start, bucket__lt=chunk_end).delete()
+                hourly += rebuild_hourly(chunk_start, chunk_end)
+                daily += rebuild_daily(chunk_start, chunk_end)
+            chunk_start = chunk_end
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{hourly} hourly and {daily} daily rollups rebuilt "
+            f"for {start.date()} .. {end.date()} in {perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,76 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from dashboard.benchmarks import SCALES, run_suite
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the HTTP endpoints and WebSocket consumers against synthetic "
+        "datasets in a throwaway test database and write a JSON report."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scales",
+            type=str,
+            default="small",
+            help=f"Comma-separated dataset scales out of {', '.join(SCALES)} (default small).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=30,
+            help="Measured requests/messages per endpoint (default 30).",
+        )
+        parser.add_argument(
+            "--fan-out",
+            type=str,
+            default="",
+            help="Comma-separated client counts to fan comments out to, e.g. 100,400,1000 (default none).",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="Write the report to this file instead of stdout.",
+        )
+
+    def handle(self, *args, scales="small", repeat=30, fan_out="", output=None, **opts):
+        names = [name.strip() for name in scales.split(",") if name.strip()]
+        unknown = [name for name in names if name not in SCALES]
+        if unknown or not names:
+            raise CommandError(f"unknown scale(s) {', '.join(unknown)}; choose from {', '.join(SCALES)}")
+        if repeat < 1:
+            raise CommandError("--repeat must be positive.")
+        try:
+            clients = [int(count) for count in fan_out.split(",") if count.strip()]
+        except ValueError:
+            raise CommandError("--fan-out must be comma-separated client counts.")
+        if any(count < 1 for count in clients):
+            raise CommandError("--fan-out client counts must be positive.")
+
+        # like the test runner: never touch the configured database
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            report = run_suite(
+                {name: SCALES[name] for name in names},
+                repeat=repeat,
+                fan_out=clients,
+                log=self.stderr.write if opts.get("verbosity", 1) > 0 else None,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        text = json.dumps(report, indent=2, sort_keys=True)
+        if output:
+            with open(output, "w") as f:
+                f.write(text + "\n")
+            self.stdout.write(self.style.SUCCESS(f"report written to {output}"))
+        else:
+            self.stdout.write(text)
@@ -1,19 +1,95 @@
-from datetime import datetime, timedelta
-from random import randint
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+from random import Random
+from time import perf_counter
+from zoneinfo import ZoneInfo
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from django.utils import timezone
 
 from dashboard.models import Station, StationSnapshot
 
+SEED_BATCH_SIZE = 5000
+# the commute and leisure peaks follow Pittsburgh's clock, whatever
+# settings.TIME_ZONE is (UTC in production)
+PROFILE_TIME_ZONE = ZoneInfo("America/New_York")
+# synthetic stations are scattered over roughly the city's service area
+SYNTHETIC_AREA = (40.40, -80.05, 40.49, -79.90)  # south, west, north, east
+SYNTHETIC_SLOTS = (15, 19, 23, 27)
+# station kind -> (weight, commute sign, weekend leisure weight): residential
+# stations empty out over the working day, business ones fill up, parks
+# fill on weekend afternoons
+STATION_KINDS = {
+    "residential": (0.5, -1.0, -0.4),
+    "business": (0.35, 1.0, -0.2),
+    "leisure": (0.15, 0.0, 1.0),
+}
+# the noise is an AR(1) process with this correlation time, so its shape
+# does not depend on --interval
+NOISE_CORRELATION_MINUTES = 30
+NOISE_SD = 0.06
+
+
+def smooth_step(hour, at, width):
+    return math.tanh((hour - at) / width)
+
+
+def commute_profile(hour, weekday):
+    """
+    -1 overnight, +1 between the morning (8:00) and evening (17:30) peaks
+    on weekdays; -1 all weekend.
+    """
+    if not weekday:
+        return -1.0
+    return smooth_step(hour, 8, 0.75) - smooth_step(hour, 17.5, 1.0) - 1
+
+
+def leisure_profile(hour, weekday):
+    """
+    0 .. 1 bump over weekend late mornings and afternoons, a weaker one on
+    weekday evenings.
+    """
+    if weekday:
+        return 0.15 * (smooth_step(hour, 17, 1.0) - smooth_step(hour, 21, 1.0))
+    return 0.5 * (smooth_step(hour, 10, 1.5) - smooth_step(hour, 17, 1.5))
+
 
 class Command(BaseCommand):
+    help = (
+        "Fill StationSnapshot with synthetic history (weekday commute peaks, "
+        "weekend leisure) for every station, or for --stations of them."
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
             "--date",
             type=str,
-            help="YYYY-MM-DD (UTC). Defaults to yesterday.",
+            help="YYYY-MM-DD (UTC) of the first day. Defaults to yesterday.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=1,
+            help="Number of days to generate (default 1).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=60,
+            help="Minutes between snapshots (default 60; 1 for scrape resolution).",
+        )
+        parser.add_argument(
+            "--stations",
+            type=int,
+            help="Seed the first N stations, creating synthetic ones if fewer exist.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=SEED_BATCH_SIZE,
+            help=f"Rows per bulk_create and transaction (default {SEED_BATCH_SIZE}).",
         )
 
     @staticmethod
@@ -21,43 +97,124 @@ class Command(BaseCommand):
         if day_str:
             # interpret in UTC
             return datetime.fromisoformat(day_str).replace(
-                hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc
+                hour=0, minute=0, second=0, microsecond=0, tzinfo=dt_timezone.utc
             )
         # yesterday, UTC
         return (timezone.now() - timedelta(days=1)).replace(
             hour=0, minute=0, second=0, microsecond=0
         )
 
-    def handle(self, *args, date=None, **opts):
-        day_start = self._day_start(date)
-        stations = Station.objects.all()
+    @staticmethod
+    def _stations(count):
+        """
+        The first `count` stations by id (all when None), topped up with
+        synthetic ones.
+        """
+        stations = Station.objects.order_by("id")
+        if count is None:
+            return list(stations)
+        stations = list(stations[:count])
+        missing = count - len(stations)
+        if missing > 0:
+            rng = Random(len(stations))
+            south, west, north, east = SYNTHETIC_AREA
+            stations += Station.objects.bulk_create(
+                Station(
+                    name=f"Synthetic {len(stations) + i:05d}",
+                    latitude=round(rng.uniform(south, north), 6),
+                    longitude=round(rng.uniform(west, east), 6),
+                    slots=rng.choice(SYNTHETIC_SLOTS),
+                )
+                for i in range(missing)
+            )
+        return stations
 
-        total_inserted = 0
-        for st in stations:
-            # clear any existing snapshots for that day
-            StationSnapshot.objects.filter(
-                station=st, timestamp__date=day_start.date()
-            ).delete()
-
-            slots = st.slots or 20  # fallback if slots is null/zero
-            snapshots = []
-            for h in range(24):
-                ts = day_start + timedelta(hours=h)
-                free = randint(0, slots)
-                snapshots.append(
-                    StationSnapshot(
-                        station=st,
-                        timestamp=ts,
-                        free_bikes=free,
-                        empty_slots=max(slots - free, 0),
-                    )
+    @staticmethod
+    def _profiles(start, count, interval):
+        """
+        (timestamp, commute, leisure) for every column, computed once and
+        shared by all stations; the hour of day is PROFILE_TIME_ZONE's.
+        """
+        columns = []
+        for k in range(count):
+            ts = start + timedelta(minutes=k * interval)
+            local = ts.astimezone(PROFILE_TIME_ZONE)
+            hour = local.hour + local.minute / 60
+            weekday = local.weekday() < 5
+            columns.append((ts, commute_profile(hour, weekday), leisure_profile(hour, weekday)))
+        return columns
+
+    @staticmethod
+    def _snapshots(stations, columns, interval):
+        """
+        Rows in scrape order (every station at one timestamp, then the
+        next) as a production database receives them. Each station draws
+        its kind, mid level and swing from a Random seeded by its id, so
+        reruns are identical.
+        """
+        kinds = list(STATION_KINDS.values())
+        persistence = math.exp(-interval / NOISE_CORRELATION_MINUTES)
+        innovation = NOISE_SD * math.sqrt(1 - persistence ** 2)
+
+        states = []
+        for station in stations:
+            rng = Random(station.id)
+            _, sign, leisure = rng.choices(kinds, weights=[kind[0] for kind in kinds])[0]
+            states.append([
+                station.id,
+                station.slots or 20,  # fallback if slots is null/zero
+                rng.uniform(0.4, 0.6),
+                rng.uniform(0.25, 0.45),
+                sign,
+                leisure,
+                rng,
+                rng.gauss(0, NOISE_SD),
+            ])
+
+        for ts, commute, weekend in columns:
+            for state in states:
+                station_id, slots, mid, swing, sign, leisure, rng, noise = state
+                noise = persistence * noise + rng.gauss(0, innovation)
+                state[7] = noise
+                level = mid + swing * (sign * commute + leisure * weekend) + noise
+                free = min(max(round(level * slots), 0), slots)
+                yield StationSnapshot(
+                    station_id=station_id,
+                    timestamp=ts,
+                    free_bikes=free,
+                    empty_slots=slots - free,
                 )
-            StationSnapshot.objects.bulk_create(snapshots)
-            total_inserted += len(snapshots)
+
+    def handle(self, *args, date=None, days=1, interval=60, stations=None,
+               batch_size=SEED_BATCH_SIZE, **opts):
+        if interval < 1 or days < 1 or batch_size < 1:
+            raise CommandError("--days, --interval and --batch-size must be positive.")
+        start = self._day_start(date)
+        end = start + timedelta(days=days)
+        count = days * 24 * 60 // interval
+        stations = self._stations(stations)
+
+        # clear any existing snapshots of those stations for those days
+        StationSnapshot.objects.filter(
+            timestamp__gte=start, timestamp__lt=end, station__in=stations
+        ).delete()
+
+        started = perf_counter()
+        total_inserted = 0
+        rows = self._snapshots(stations, self._profiles(start, count, interval), interval)
+        while batch := list(islice(rows, batch_size)):
+            # one commit per batch: an interrupted run keeps what it wrote
+            with transaction.atomic():
+                StationSnapshot.objects.bulk_create(batch)
+            total_inserted += len(batch)
+            if opts.get("verbosity", 1) > 1:
+                self.stdout.write(f"{total_inserted} rows, {total_inserted / (perf_counter() - started):.0f} rows/s")
+        elapsed = perf_counter() - started
 
         self.stdout.write(
             self.style.SUCCESS(
                 f"{total_inserted} snapshots inserted "
-                f"for {stations.count()} stations on {day_start.date()}."
+                f"for {len(stations)} stations on {start.date()} .. {(end - timedelta(days=1)).date()} "
+                f"in {elapsed:.1f}s ({total_inserted / elapsed if elapsed else 0:.0f} rows/s)."
             )
         )
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from dashboard import analytics
+from dashboard.models import StationSnapshot
+from dashboard.rollups import day_floor
+
+
+class Command(BaseCommand):
+    help = (
+        "Refit the per-station, per-hour-of-week forecast baselines from raw "
+        "snapshots. Ingest keeps them current afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            type=str,
+            help="YYYY-MM-DD (UTC). Defaults to the oldest snapshot.",
+        )
+        parser.add_argument(
+            "--end",
+            type=str,
+            help="YYYY-MM-DD (UTC), exclusive. Defaults to the day after the newest snapshot.",
+        )
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=7,
+            help="Days loaded into memory at a time (default 7).",
+        )
+
+    @staticmethod
+    def _day(day_str):
+        return datetime.fromisoformat(day_str).replace(tzinfo=timezone.utc)
+
+    def handle(self, *args, start=None, end=None, chunk_days=7, **opts):
+        if analytics.np is None:
+            raise CommandError("numpy is not installed.")
+
+        bounds = StationSnapshot.objects.aggregate(first=Min("timestamp"), last=Max("timestamp"))
+        if bounds["first"] is None:
+            self.stdout.write("no snapshots to train on")
+            return
+
+        start = self._day(start) if start else day_floor(bounds["first"])
+        end = self._day(end) if end else day_floor(bounds["last"]) + timedelta(days=1)
+
+        started = perf_counter()
+        with transaction.atomic():
+            rows = analytics.train_baselines(start, end, chunk=timedelta(days=chunk_days))
+        self.stdout.write(self.style.SUCCESS(
+            f"{rows} baselines trained on {start.date()} .. {end.date()} "
+            f"in {perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:09
+
+import django.db.models.deletion
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+def backfill_current_status(apps, schema_editor):
+    Station = apps.get_model('dashboard', 'Station')
+    StationStatusLog = apps.get_model('dashboard', 'StationStatusLog')
+    StationCurrentStatus = apps.get_model('dashboard', 'StationCurrentStatus')
+
+    rows = []
+    for station in Station.objects.all():
+        log = (
+            StationStatusLog.objects.filter(station=station)
+            .order_by('-date', '-time', '-id')
+            .first()
+        )
+        if log is None:
+            continue
+        rows.append(StationCurrentStatus(
+            station=station,
+            updated_at=datetime.combine(log.date, log.time, tzinfo=timezone.utc),
+            free_bikes=log.free_bikes,
+            empty_slots=log.empty_slots,
+        ))
+    StationCurrentStatus.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_stop_task_tour_stop_tour_stationsnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationCurrentStatus',
+            fields=[
+                ('station', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='current_status', serialize=False, to='dashboard.station')),
+                ('updated_at', models.DateTimeField()),
+                ('empty_slots', models.IntegerField()),
+                ('free_bikes', models.IntegerField()),
+            ],
+        ),
+        migrations.RunPython(backfill_current_status, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_stationcurrentstatus'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('samples', models.PositiveIntegerField()),
+                ('free_bikes_sum', models.PositiveIntegerField()),
+                ('min_free_bikes', models.PositiveSmallIntegerField()),
+                ('max_free_bikes', models.PositiveSmallIntegerField()),
+                ('minutes_empty', models.PositiveIntegerField()),
+                ('minutes_full', models.PositiveIntegerField()),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='dashboard.station')),
+            ],
+            options={
+                'ordering': ['bucket'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('station', 'bucket'), name='uniq_daily_rollup_station_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StationHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('samples', models.PositiveIntegerField()),
+                ('free_bikes_sum', models.PositiveIntegerField()),
+                ('min_free_bikes', models.PositiveSmallIntegerField()),
+                ('max_free_bikes', models.PositiveSmallIntegerField()),
+                ('minutes_empty', models.PositiveIntegerField()),
+                ('minutes_full', models.PositiveIntegerField()),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_rollups', to='dashboard.station')),
+            ],
+            options={
+                'ordering': ['bucket'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('station', 'bucket'), name='uniq_hourly_rollup_station_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_station_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['commented_to', '-creation_time'], name='comment_station_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stationdailyrollup',
+            index=models.Index(fields=['bucket'], name='stationdailyrollup_bucket_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stationhourlyrollup',
+            index=models.Index(fields=['bucket'], name='stationhourlyrollup_bucket_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stationstatuslog',
+            index=models.Index(fields=['station', '-date', '-time'], name='statuslog_station_latest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stationstatuslog',
+            index=models.Index(fields=['date'], name='statuslog_date_idx'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:24
+
+from datetime import datetime, timezone
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def copy_status_logs(apps, schema_editor):
+    """
+    Fold StationStatusLog history into StationSnapshot. Before ingest shared
+    one timestamp, a scrape wrote its log and snapshot microseconds apart,
+    so a log is treated as already present when its station has a snapshot
+    in the same second. Copied logs keep their full (microsecond) time;
+    only the duplicate check is per second.
+    """
+    StationStatusLog = apps.get_model('dashboard', 'StationStatusLog')
+    StationSnapshot = apps.get_model('dashboard', 'StationSnapshot')
+
+    station_ids = StationStatusLog.objects.values_list('station_id', flat=True).distinct()
+    for station_id in list(station_ids):
+        existing = {
+            ts.replace(microsecond=0)
+            for ts in StationSnapshot.objects.filter(station_id=station_id)
+            .values_list('timestamp', flat=True).iterator(chunk_size=BATCH_SIZE)
+        }
+        batch = []
+        logs = (
+            StationStatusLog.objects.filter(station_id=station_id)
+            .values_list('date', 'time', 'free_bikes', 'empty_slots')
+            .iterator(chunk_size=BATCH_SIZE)
+        )
+        for day, moment, free_bikes, empty_slots in logs:
+            timestamp = datetime.combine(day, moment, tzinfo=timezone.utc)
+            if timestamp.replace(microsecond=0) in existing:
+                continue
+            existing.add(timestamp.replace(microsecond=0))
+            batch.append(StationSnapshot(
+                station_id=station_id,
+                timestamp=timestamp,
+                free_bikes=max(free_bikes, 0),
+                empty_slots=max(empty_slots, 0),
+            ))
+            if len(batch) >= BATCH_SIZE:
+                StationSnapshot.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        StationSnapshot.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_hot_query_indexes'),
+    ]
+
+    operations = [
+        # irreversible: unapplying would recreate an empty StationStatusLog
+        # and silently drop its history
+        migrations.RunPython(copy_status_logs),
+        migrations.DeleteModel(
+            name='StationStatusLog',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_consolidate_status_logs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationSeasonalBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour_of_week', models.PositiveSmallIntegerField()),
+                ('flow', models.IntegerField(default=0)),
+                ('minutes', models.FloatField(default=0)),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='baselines', to='dashboard.station')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('hour_of_week', 'station'), name='uniq_baseline_hour_station')],
+            },
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
 
+from dashboard.serializers import format_date, format_datetime, serialize_rows
+
 # Create your models here.
 
 
@@ -12,18 +15,36 @@ class Station(models.Model):
      
 	def __str__(self):
 		return f'Station(id = {self.id}): name = {self.name}, latitude = {self.latitude}, longitude = {self.longitude}, slots = {self.slots}'
+
+	@classmethod
+	def with_latest_status(cls):
+		"""
+		Annotate every station with its current status
+		(latest_free_bikes / latest_empty_slots, None when never scraped)
+		read from StationCurrentStatus through a primary-key join.
+		"""
+		return cls.objects.annotate(
+			latest_free_bikes=F('current_status__free_bikes'),
+			latest_empty_slots=F('current_status__empty_slots'),
+		)
        
-class StationStatusLog(models.Model):
-    date = models.DateField()
-    time = models.TimeField()
+class StationCurrentStatus(models.Model):
+    """
+    Latest scraped status of a station, one row per Station, upserted on
+    every ingest so map reads never touch the StationSnapshot history.
+    """
+    station = models.OneToOneField(
+        Station,
+        primary_key=True,
+        related_name="current_status",
+        on_delete=models.CASCADE,
+    )
+    updated_at = models.DateTimeField()
     empty_slots = models.IntegerField()
     free_bikes = models.IntegerField()
-    empty = models.BooleanField()
-    full = models.BooleanField()
-    station = models.ForeignKey(Station, on_delete=models.PROTECT)
-    
+
     def __str__(self):
-          return f'StationStatusLog(id = {self.id}, empty = {self.empty}, full = {self.full})'
+        return f'StationCurrentStatus(station_id = {self.station_id}, free_bikes = {self.free_bikes}, empty_slots = {self.empty_slots})'
          
 class Comment(models.Model):
     commented_to = models.ForeignKey(Station, on_delete=models.PROTECT)
@@ -32,23 +53,29 @@ class Comment(models.Model):
     name = models.CharField(max_length=20)
     creation_time = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            # a station's newest comments first
+            models.Index(fields=["commented_to", "-creation_time"], name="comment_station_recent_idx"),
+        ]
+
     def __str__(self):
         return f'Comment(id={self.id}): commented_by={self.posted_by}'
     
     @classmethod
-    def make_comment_list(cls):
-        comment_dict_list = []
-        for comment in cls.objects.all():
-            comment_dict = {
-                'id': comment.id,
-                'commented_to_id': comment.commented_to.id,
-                'commentor': comment.commentor.first_name,
-                'content': comment.content,
-                'name': comment.commentor.first_name,
-                'creation_time': comment.creation_time.strftime("%Y-%m-%d %H:%M:%S")
-            }
-            comment_dict_list.append(comment_dict)
-        return comment_dict_list
+    def make_comment_list(cls, comments=None):
+        return list(serialize_rows(
+            cls.objects.all() if comments is None else comments,
+            {
+                'id': 'id',
+                'commented_to_id': 'commented_to_id',
+                'commentor': 'commentor__first_name',
+                'content': 'content',
+                'name': 'commentor__first_name',
+                'creation_time': 'creation_time',
+            },
+            {'creation_time': format_datetime},
+        ))
     
 class Reply(models.Model):
     reply_to = models.ForeignKey(Comment, on_delete=models.PROTECT)
@@ -61,19 +88,19 @@ class Reply(models.Model):
         return f'Reply(id={self.id}): replier={self.replier.first_name}'
     
     @classmethod
-    def make_reply_list(cls):
-        reply_dict_list = []
-        for reply in cls.objects.all():
-            reply_dict = {
-                'id': reply.id,
-                'replied_to_id': reply.reply_to.id,
-                'replier': reply.replier.first_name,
-                'content': reply.content,
-                'name': reply.replier.first_name,
-                'creation_time': reply.creation_time.strftime("%Y-%m-%d %H:%M:%S")
-            }
-            reply_dict_list.append(reply_dict)
-        return reply_dict_list
+    def make_reply_list(cls, replies=None):
+        return list(serialize_rows(
+            cls.objects.all() if replies is None else replies,
+            {
+                'id': 'id',
+                'replied_to_id': 'reply_to_id',
+                'replier': 'replier__first_name',
+                'content': 'content',
+                'name': 'replier__first_name',
+                'creation_time': 'creation_time',
+            },
+            {'creation_time': format_datetime},
+        ))
     
 class Tour(models.Model):
     due_date = models.DateField()
@@ -83,16 +110,16 @@ class Tour(models.Model):
          return f'Tour(id = {self.id}): due_date = {self.due_date}, assigned_to = {self.assigned_to}'
     
     @classmethod
-    def make_tour_list(cls):
-        tour_dict_list = []
-        for tour in cls.objects.all():
-            tour_dict = {
-                'id': tour.id,
-                'due_date': tour.due_date.strftime("%Y-%m-%d"),
-                'assigned_to': tour.assigned_to.first_name
-            }
-            tour_dict_list.append(tour_dict)
-        return tour_dict_list
+    def make_tour_list(cls, tours=None):
+        return list(serialize_rows(
+            cls.objects.all() if tours is None else tours,
+            {
+                'id': 'id',
+                'due_date': 'due_date',
+                'assigned_to': 'assigned_to__first_name',
+            },
+            {'due_date': format_date},
+        ))
      
 class Stop(models.Model):
     tour = models.ForeignKey(Tour, on_delete=models.CASCADE)
@@ -103,18 +130,18 @@ class Stop(models.Model):
         return f'Stop(id = {self.id}): tour_id = {self.tour.id}, station_name = {self.station.name}'
     
     @classmethod
-    def make_stop_list(cls):
-        stop_dict_list = []
-        for stop in cls.objects.all():
-            stop_dict = {
-                'id': stop.id,
-                'tour_id': stop.tour.id,
-                'tour_date': stop.tour.date,
-                'station_name': stop.station.name,
-                'order': stop.order,
-            }
-            stop_dict_list.append(stop_dict)
-        return stop_dict_list
+    def make_stop_list(cls, stops=None):
+        return list(serialize_rows(
+            cls.objects.all() if stops is None else stops,
+            {
+                'id': 'id',
+                'tour_id': 'tour_id',
+                'tour_date': 'tour__due_date',
+                'station_name': 'station__name',
+                'order': 'order',
+            },
+            {'tour_date': format_date},
+        ))
      
 class Task(models.Model):
     stop = models.ForeignKey(Stop, on_delete=models.CASCADE)
@@ -124,17 +151,16 @@ class Task(models.Model):
          return f'Task(id = {self.id}): stop = {self.stop.id}, content = {self.content}'
     
     @classmethod
-    def make_task_list(cls):
-        task_dict_list = []
-        for task in cls.objects.all():
-            task_dict = {
-                'id': task.id,
-                'stop_order': task.stop.order,
-                'stop_name': task.stop.name,
-                'content': task.content,
-            }
-            task_dict_list.append(task_dict)
-        return task_dict_list
+    def make_task_list(cls, tasks=None):
+        return list(serialize_rows(
+            cls.objects.all() if tasks is None else tasks,
+            {
+                'id': 'id',
+                'stop_order': 'stop__order',
+                'stop_name': 'stop__station__name',
+                'content': 'content',
+            },
+        ))
 
 class StationSnapshot(models.Model):
     """
@@ -153,7 +179,8 @@ class StationSnapshot(models.Model):
         ordering = ["-timestamp"]
         get_latest_by = "timestamp"
         constraints = [
-            # Prevent duplicate rows for the same scrape
+            # Prevent duplicate rows for the same scrape; its index also
+            # serves the per-station timestamp ranges of the trend chart
             models.UniqueConstraint(
                 fields=["station", "timestamp"],
                 name="uniq_station_timestamp",
@@ -161,4 +188,98 @@ class StationSnapshot(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.station.name} @ {self.timestamp:%Y-%m-%d %H:%M:%S}"
\ No newline at end of file
+        return f"{self.station.name} @ {self.timestamp:%Y-%m-%d %H:%M:%S}"
+
+class StationRollup(models.Model):
+    """
+    Aggregated StationSnapshot rows for one station over one bucket.
+    Each snapshot stands for one minute (the collector polls every 60 s).
+    """
+    bucket          = models.DateTimeField()
+    samples         = models.PositiveIntegerField()
+    free_bikes_sum  = models.PositiveIntegerField()
+    min_free_bikes  = models.PositiveSmallIntegerField()
+    max_free_bikes  = models.PositiveSmallIntegerField()
+    minutes_empty   = models.PositiveIntegerField()
+    minutes_full    = models.PositiveIntegerField()
+
+    class Meta:
+        abstract = True
+        ordering = ["bucket"]
+        indexes = [
+            # network-wide bucket ranges (daily rebuilds, retention sweeps);
+            # per-station reads use the (station, bucket) unique constraint
+            models.Index(fields=["bucket"], name="%(class)s_bucket_idx"),
+        ]
+
+    @property
+    def avg_free_bikes(self):
+        return self.free_bikes_sum / self.samples if self.samples else None
+
+    def __str__(self):
+        return f"{self.station.name} @ {self.bucket:%Y-%m-%d %H:%M}"
+
+
+class StationHourlyRollup(StationRollup):
+    station = models.ForeignKey(
+        Station,
+        related_name="hourly_rollups",
+        on_delete=models.CASCADE,
+    )
+
+    class Meta(StationRollup.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=["station", "bucket"],
+                name="uniq_hourly_rollup_station_bucket",
+            )
+        ]
+
+
+class StationDailyRollup(StationRollup):
+    station = models.ForeignKey(
+        Station,
+        related_name="daily_rollups",
+        on_delete=models.CASCADE,
+    )
+
+    class Meta(StationRollup.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=["station", "bucket"],
+                name="uniq_daily_rollup_station_bucket",
+            )
+        ]
+
+
+class StationSeasonalBaseline(models.Model):
+    """
+    Net change in free bikes of a station during one hour of the week
+    (0 = Monday 00:00 UTC), summed over every pair of consecutive
+    snapshots. flow / minutes is the expected bikes-per-minute rate the
+    forecast walks forward.
+    """
+    station      = models.ForeignKey(
+        Station,
+        related_name="baselines",
+        on_delete=models.CASCADE,
+    )
+    hour_of_week = models.PositiveSmallIntegerField()
+    flow         = models.IntegerField(default=0)
+    minutes      = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            # hour first: the map reads every station for the next hours
+            models.UniqueConstraint(
+                fields=["hour_of_week", "station"],
+                name="uniq_baseline_hour_station",
+            )
+        ]
+
+    @property
+    def rate(self):
+        return self.flow / self.minutes if self.minutes else 0.0
+
+    def __str__(self):
+        return f"{self.station.name} @ hour {self.hour_of_week}: {self.rate:+.3f} bikes/min"
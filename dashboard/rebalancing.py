@@ -0,0 +1,136 @@
+from time import perf_counter
+
+from django.db import transaction
+
+from dashboard.analytics.metrics import rebalancing_need
+from dashboard.models import Station, Stop, Task, Tour
+
+# NumPy is optional so Django checks/migrations run without it; planning a
+# tour without it raises
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EARTH_RADIUS_KM = 6371.0
+TWO_OPT_TIME_BUDGET = 0.5
+
+
+def haversine_matrix(latitudes, longitudes):
+    """
+    Great-circle distances in km between every pair of points.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    a = (
+        np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+        + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def route_length(route, dist):
+    return float(dist[route[:-1], route[1:]].sum())
+
+
+def nearest_neighbour_route(dist, start=0):
+    visited = np.zeros(len(dist), dtype=bool)
+    route = [start]
+    visited[start] = True
+    for _ in range(len(dist) - 1):
+        nearest = int(np.where(visited, np.inf, dist[route[-1]]).argmin())
+        route.append(nearest)
+        visited[nearest] = True
+    return np.array(route)
+
+
+def two_opt(route, dist, deadline):
+    """
+    Improve an open path (its first stop stays put) by reversing segments
+    until no reversal shortens it or `deadline` (perf_counter) passes.
+    For each edge every candidate second edge is scored in one vector op.
+    """
+    route = route.copy()
+    n = len(route)
+    improved = True
+    while improved and perf_counter() < deadline:
+        improved = False
+        for i in range(n - 2):
+            if perf_counter() >= deadline:
+                break
+            a, b = route[i], route[i + 1]
+            j = np.arange(i + 2, n)
+            c = route[j]
+            # reversing route[i+1 .. j] swaps edges (a, b), (c, d) for
+            # (a, c), (b, d); the last stop has no d
+            d = route[np.minimum(j + 1, n - 1)]
+            has_d = j < n - 1
+            delta = (
+                dist[a, c] + np.where(has_d, dist[b, d], 0)
+                - dist[a, b] - np.where(has_d, dist[c, d], 0)
+            )
+            best = int(delta.argmin())
+            if delta[best] < -1e-9:
+                route[i + 1:j[best] + 1] = route[i + 1:j[best] + 1][::-1].copy()
+                improved = True
+    return route
+
+
+def optimize_route(latitudes, longitudes, start=0, time_budget=TWO_OPT_TIME_BUDGET):
+    """
+    Stop order (indices into the inputs) starting at `start`: nearest
+    neighbour, then 2-opt for at most `time_budget` seconds in total.
+    """
+    if np is None:
+        raise RuntimeError("numpy is not installed.")
+    deadline = perf_counter() + time_budget
+    if len(latitudes) < 2:
+        return list(range(len(latitudes)))
+    dist = haversine_matrix(latitudes, longitudes)
+    route = nearest_neighbour_route(dist, start)
+    return two_opt(route, dist, deadline).tolist()
+
+
+def stations_needing_rebalancing(max_stops=None):
+    """
+    (station, need) for every scraped station outside the healthy band,
+    most urgent first.
+    """
+    needs = []
+    for s in Station.with_latest_status().exclude(latest_free_bikes=None):
+        need = int(rebalancing_need(s.latest_free_bikes, s.latest_free_bikes + s.latest_empty_slots))
+        if need:
+            needs.append((s, need))
+    needs.sort(key=lambda item: -abs(item[1]))
+    return needs[:max_stops] if max_stops is not None else needs
+
+
+@transaction.atomic
+def plan_rebalancing_tour(due_date, assigned_to, max_stops=None, time_budget=TWO_OPT_TIME_BUDGET):
+    """
+    Create a Tour visiting every station that needs rebalancing, starting
+    at the most urgent one, with one Stop (in route order) and one Task per
+    station. Returns the tour, or None when no station needs a visit.
+    """
+    needs = stations_needing_rebalancing(max_stops)
+    if not needs:
+        return None
+
+    order = optimize_route(
+        [float(s.latitude) for s, _ in needs],
+        [float(s.longitude) for s, _ in needs],
+        time_budget=time_budget,
+    )
+    tour = Tour.objects.create(due_date=due_date, assigned_to=assigned_to)
+    stops = Stop.objects.bulk_create(
+        Stop(tour=tour, station=needs[index][0], order=position)
+        for position, index in enumerate(order, start=1)
+    )
+    Task.objects.bulk_create(
+        Task(
+            stop=stop,
+            content=f"Deliver {need} bikes" if need > 0 else f"Collect {-need} bikes",
+        )
+        for stop, need in zip(stops, (needs[index][1] for index in order))
+    )
+    return tour
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+
+from dashboard.models import StationDailyRollup, StationHourlyRollup, StationSnapshot
+
+ROLLUP_BATCH_SIZE = 500
+ROLLUP_FIELDS = [
+    "samples",
+    "free_bikes_sum",
+    "min_free_bikes",
+    "max_free_bikes",
+    "minutes_empty",
+    "minutes_full",
+]
+
+
+def hour_floor(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def day_floor(moment):
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _upsert(model, rows):
+    model.objects.bulk_create(
+        [model(**row) for row in rows],
+        batch_size=ROLLUP_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["station", "bucket"],
+        update_fields=ROLLUP_FIELDS,
+    )
+    return len(rows)
+
+
+def rebuild_hourly(start, end, station_ids=None):
+    """
+    Recompute the hourly rollups of [start, end) from raw snapshots in one
+    grouped query. Returns the number of rollup rows written.
+    """
+    snapshots = StationSnapshot.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if station_ids is not None:
+        snapshots = snapshots.filter(station_id__in=station_ids)
+
+    rows = (
+        snapshots.annotate(bucket=TruncHour("timestamp"))
+        .values("station_id", "bucket")
+        .annotate(
+            samples=Count("id"),
+            free_bikes_sum=Sum("free_bikes"),
+            min_free_bikes=Min("free_bikes"),
+            max_free_bikes=Max("free_bikes"),
+            minutes_empty=Count("id", filter=Q(free_bikes=0)),
+            minutes_full=Count("id", filter=Q(empty_slots=0)),
+        )
+        .order_by()
+    )
+    return _upsert(StationHourlyRollup, list(rows))
+
+
+def rebuild_daily(start, end, station_ids=None):
+    """
+    Recompute the daily rollups of [start, end) from the hourly rollups.
+    """
+    hourly = StationHourlyRollup.objects.filter(bucket__gte=start, bucket__lt=end)
+    if station_ids is not None:
+        hourly = hourly.filter(station_id__in=station_ids)
+
+    rows = (
+        hourly.annotate(day=TruncDay("bucket"))
+        .values("station_id", "day")
+        .annotate(
+            samples=Sum("samples"),
+            free_bikes_sum=Sum("free_bikes_sum"),
+            min_free_bikes=Min("min_free_bikes"),
+            max_free_bikes=Max("max_free_bikes"),
+            minutes_empty=Sum("minutes_empty"),
+            minutes_full=Sum("minutes_full"),
+        )
+        .order_by()
+    )
+    return _upsert(StationDailyRollup, [
+        {"bucket": row["day"], **{key: row[key] for key in ["station_id", *ROLLUP_FIELDS]}}
+        for row in rows
+    ])
+
+
+def update_rollups(scraped_at, station_ids=None):
+    """
+    Refresh the hour and day buckets containing `scraped_at`; called by the
+    ingest path after each scrape so rollups never lag the raw snapshots.
+    """
+    hour = hour_floor(scraped_at)
+    day = day_floor(scraped_at)
+    rebuild_hourly(hour, hour + timedelta(hours=1), station_ids)
+    rebuild_daily(day, day + timedelta(days=1), station_ids)
@@ -2,6 +2,8 @@ from django.urls import path
 from dashboard import consumers
 
 websocket_urlpatterns = [
-    path('dashboard/data', consumers.CommentConsumer.as_asgi()),
+    path('dashboard/data/<int:station_id>', consumers.CommentConsumer.as_asgi()),
     path('dashboard/tour', consumers.TourConsumer.as_asgi()),
+    path('dashboard/tour/<int:tour_id>', consumers.TourConsumer.as_asgi()),
+    path('dashboard/stations', consumers.StationStatusConsumer.as_asgi()),
 ]
\ No newline at end of file
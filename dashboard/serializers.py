@@ -0,0 +1,27 @@
+SERIALIZE_CHUNK_SIZE = 2000
+
+
+def serialize_rows(queryset, fields, formatters=None, chunk_size=SERIALIZE_CHUNK_SIZE):
+    """
+    Yield one dict per row of `queryset`.
+
+    `fields` maps each output key to an ORM lookup (foreign keys may be
+    followed with `__`), so related columns come back through JOINs in a
+    single values() query that is streamed in chunks. `formatters` maps
+    output keys to callables applied to the raw value.
+    """
+    formatters = formatters or {}
+    lookups = list(dict.fromkeys(fields.values()))
+    for row in queryset.values(*lookups).iterator(chunk_size=chunk_size):
+        yield {
+            key: formatters[key](row[lookup]) if key in formatters else row[lookup]
+            for key, lookup in fields.items()
+        }
+
+
+def format_datetime(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def format_date(value):
+    return value.strftime("%Y-%m-%d")
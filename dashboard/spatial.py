@@ -0,0 +1,53 @@
+import math
+from collections import defaultdict
+
+# ~1.1 km of latitude (~850 m of longitude in Pittsburgh): a zoomed-in map
+# viewport covers a handful of cells.
+GRID_CELL_DEGREES = 0.01
+
+
+class StationGrid:
+    """
+    Uniform latitude/longitude grid over station payload dicts. A bounding
+    box query only visits the cells it overlaps and returns the matches in
+    their original order.
+    """
+
+    def __init__(self, stations, cell_degrees=GRID_CELL_DEGREES):
+        self.stations = list(stations)
+        self.cell_degrees = cell_degrees
+        self.cells = defaultdict(list)
+        for position, st in enumerate(self.stations):
+            self.cells[self.cell(st["latitude"], st["longitude"])].append(position)
+
+    def cell(self, latitude, longitude):
+        return (
+            math.floor(latitude / self.cell_degrees),
+            math.floor(longitude / self.cell_degrees),
+        )
+
+    def within(self, south, west, north, east):
+        south_row, west_col = self.cell(south, west)
+        north_row, east_col = self.cell(north, east)
+        wanted = (north_row - south_row + 1) * (east_col - west_col + 1)
+        if wanted > len(self.cells):
+            # a box wider than the network: walk the occupied cells instead
+            candidates = [
+                positions for (row, col), positions in self.cells.items()
+                if south_row <= row <= north_row and west_col <= col <= east_col
+            ]
+        else:
+            candidates = [
+                self.cells.get((row, col), ())
+                for row in range(south_row, north_row + 1)
+                for col in range(west_col, east_col + 1)
+            ]
+
+        positions = sorted(
+            position
+            for cell_positions in candidates
+            for position in cell_positions
+            if south <= self.stations[position]["latitude"] <= north
+            and west <= self.stations[position]["longitude"] <= east
+        )
+        return [self.stations[position] for position in positions]
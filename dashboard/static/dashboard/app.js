@@ -58,6 +58,8 @@ function initOverview() {
     attribution: '&copy; OpenStreetMap'
   }).addTo(map);
 
+  const stationsById = {};
+
   fetch("/api/stations/")
     .then(r => r.json())
     .then(data => {
@@ -72,34 +74,7 @@ function initOverview() {
 
         const status = document.createElement("span");
         status.className = "status-pill";
-
-        let statusText;
-        switch (s.status) {
-          case "bad_empty":
-            status.classList.add("status-bad");
-            statusText = "0%";
-            break;
-          case "low":
-            status.classList.add("status-low");
-            statusText = `${s.pct_full}%`;
-            break;
-          case "ok":
-            status.classList.add("status-ok");
-            statusText = `${s.pct_full}%`;
-            break;
-          case "high":
-            status.classList.add("status-high");
-            statusText = `${s.pct_full}%`;
-            break;
-          case "bad_full":
-            status.classList.add("status-bad");
-            statusText = "100%";
-            break;
-          default:
-            status.classList.add("status-ok");
-            statusText = `${s.pct_full}%`;
-        }
-        status.textContent = statusText;
+        renderStatusPill(status, s);
 
         li.append(link, status);
         listEl.appendChild(li);
@@ -120,8 +95,66 @@ function initOverview() {
 
         // if you want direct navigation on pin click instead:
         // m.on("click", () => { window.location.href = `/dashboard/station/${s.id}/`; });
+
+        stationsById[s.id] = { station: s, pill: status, marker: m };
       });
+
+      // after the initial load only changed stations are pushed
+      connectStationStream(stationsById);
+    });
+}
+
+function renderStatusPill(status, s) {
+  status.className = "status-pill";
+
+  let statusText;
+  switch (s.status) {
+    case "bad_empty":
+      status.classList.add("status-bad");
+      statusText = "0%";
+      break;
+    case "low":
+      status.classList.add("status-low");
+      statusText = `${s.pct_full}%`;
+      break;
+    case "ok":
+      status.classList.add("status-ok");
+      statusText = `${s.pct_full}%`;
+      break;
+    case "high":
+      status.classList.add("status-high");
+      statusText = `${s.pct_full}%`;
+      break;
+    case "bad_full":
+      status.classList.add("status-bad");
+      statusText = "100%";
+      break;
+    default:
+      status.classList.add("status-ok");
+      statusText = `${s.pct_full}%`;
+  }
+  status.textContent = statusText;
+}
+
+function connectStationStream(stationsById) {
+  const wsProtocol = window.location.protocol === "https:" ? "wss:" : "ws:";
+  const socket = new WebSocket(`${wsProtocol}//${window.location.host}/dashboard/stations`);
+
+  socket.onmessage = event => {
+    const response = JSON.parse(event.data);
+    if (response.action !== "station_delta") return;
+
+    response.stations.forEach(change => {
+      const entry = stationsById[change.id];
+      if (!entry) return;
+
+      Object.assign(entry.station, change);
+      const s = entry.station;
+      renderStatusPill(entry.pill, s);
+      entry.marker.setIcon(ICONS[s.status] || ICONS.ok);
+      entry.marker.setPopupContent(`<strong>${s.name}</strong><br>${s.pct_full}% full`);
     });
+  };
 }
 
 /* -------- Station detail page: details + comments + chart -------- */
@@ -7,8 +7,8 @@ function connectToServer() {
     // Use wss: protocol if site using https:, otherwise use ws: protocol
     let wsProtocol = window.location.protocol === "https:" ? "wss:" : "ws:"
 
-    // Create a new WebSocket.
-    let url = `${wsProtocol}//${window.location.host}/dashboard/data`
+    // Create a new WebSocket, joined to this station's comment stream.
+    let url = `${wsProtocol}//${window.location.host}/dashboard/data/${currentStationId()}`
     // websocket handshake process done here
     socket = new WebSocket(url)
 
@@ -30,10 +30,14 @@ function connectToServer() {
     // Handle messages received from the server.
     socket.onmessage = function(event) {
         let response = JSON.parse(event.data)
-        if (("commentor" in response[0]) && Array.isArray(response)) {
-            updateComments(response)
-        } else if (("replier" in response[0]) && Array.isArray(response)){
-            updateReplies(response)
+        if (response.action === "comments") {
+            updateComments(response.comments, true)
+            updateReplies(response.replies)
+            updateLoadOlder(response)
+        } else if (response.action === "comment_added") {
+            updateComments([response.comment], false)
+        } else if (response.action === "reply_added") {
+            updateReplies([response.reply])
         }
         else {
             displayResponse(response)
@@ -42,6 +46,34 @@ function connectToServer() {
 
 }
 
+function currentStationId() {
+    const stationSection = document.getElementById("stationDetailRoot");
+    return parseInt(stationSection.dataset.stationId);
+}
+
+function updateLoadOlder(response) {
+    let button = document.getElementById("loadOlderComments")
+    if (button == null) {
+        button = document.createElement("button")
+        button.id = "loadOlderComments"
+        button.type = "button"
+        button.className = "btn"
+        button.textContent = "Load older comments"
+        button.onclick = loadOlderComments
+        let list = document.getElementById(`commentList${currentStationId()}`)
+        list.before(button)
+    }
+    button.style.display = response.has_more ? "" : "none"
+}
+
+function loadOlderComments() {
+    let list = document.getElementById(`commentList${currentStationId()}`)
+    let oldest = list.querySelector("li[id^='id_comment_']")
+    if (oldest == null) return
+    let before = parseInt(oldest.id.split('_').pop())
+    socket.send(JSON.stringify({action: "load_comments", before: before}))
+}
+
 function displayError(message) {
     let errorElement = document.getElementById("error")
     errorElement.innerHTML = message
@@ -162,29 +194,14 @@ function sanitize(s) {
             .replace(/"/g, '&quot;')
 }
 
-function updateComments(comments) {
-    // Removes items from todolist if they not in items
-    // let liElements = document.getElementsByTagName("li")
-    // for (let i = 0; i < liElements.length; i++) {
-    //     let element = liElements[i]
-    //     let deleteIt = true
-    //     comments.forEach(comment => {
-    //         if (element.id === `id_item_${comment.id}`) deleteIt = false
-    //     })
-    //     if (deleteIt) element.remove()
-    // }
-
-    const stationSection = document.getElementById("stationDetailRoot");
-    const stationIdStr = stationSection.dataset.stationId;
-    const stationId = parseInt(stationIdStr); 
-
+function updateComments(comments, older) {
+    const stationId = currentStationId()
     let list = document.getElementById(`commentList${stationId}`)
-    // Adds each to do list item received from the server to the displayed list
+    // Pages of older comments go above what is shown; live ones below
+    let anchor = older ? list.firstChild : null
     comments.forEach(comment => {
-        if (comment.commented_to_id === stationId){
-            if (document.getElementById(`id_comment_${comment.id}`) == null) {
-            list.append(makeListItemElement(comment))
-        }
+        if (document.getElementById(`id_comment_${comment.id}`) == null) {
+            list.insertBefore(makeListItemElement(comment), anchor)
         }
     })
 }
@@ -231,10 +248,11 @@ document.addEventListener("DOMContentLoaded", () => {
 
 function drawTrend(granularity, series) {
   const ctx    = document.getElementById("trendChart").getContext("2d");
+  const intraday = granularity !== "day";
   const labels = series.map(d => {
     const dt = new Date(d.ts);
-    return granularity === "hour"
-      ? dt.toLocaleTimeString([], { hour: "2-digit" })
+    return intraday
+      ? dt.toLocaleTimeString([], { hour: "2-digit", minute: "2-digit" })
       : dt.toLocaleDateString();
   });
   const values = series.map(d => d.free);
@@ -252,7 +270,7 @@ function drawTrend(granularity, series) {
     },
     options: {
       scales: {
-        x: { title: { display: true, text: granularity === "hour" ? "Hour" : "Date" } },
+        x: { title: { display: true, text: intraday ? "Time" : "Date" } },
         y: { beginAtZero: true, title: { display: true, text: "Bikes available" } }
       },
       plugins: { legend: { display: false } }
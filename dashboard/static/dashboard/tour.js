@@ -30,10 +30,8 @@ function connectToServer() {
     // Handle messages received from the server.
     socket.onmessage = function(event) {
         let response = JSON.parse(event.data)
-        if (("commentor" in response[0]) && Array.isArray(response)) {
-            updateComments(response)
-        } else if (("replier" in response[0]) && Array.isArray(response)){
-            updateReplies(response)
+        if ("action" in response) {
+            displayMessage(`Tour update: ${response.action.replace("_", " ")}`)
         }
         else {
             displayResponse(response)
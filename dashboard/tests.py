@@ -1,3 +1,1375 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import re
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from time import perf_counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from random import Random
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import InMemoryChannelLayer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, reverse
+from django.utils import timezone
+
+from dashboard import analytics, benchmarks, encoding, rebalancing, routing, views
+from dashboard.collector import SnapshotCollector
+from dashboard.consumers import CommentConsumer, StationStatusConsumer
+from dashboard.management.commands.seed_dummy_snapshots import (
+    Command as SeedCommand, commute_profile, leisure_profile,
+)
+from dashboard.rollups import day_floor
+from dashboard.spatial import StationGrid
+from dashboard.models import (
+    Comment, Reply, Station, StationCurrentStatus, StationSnapshot,
+    Stop, Task, Tour, StationDailyRollup, StationHourlyRollup, StationSeasonalBaseline,
+)
+
+
+def make_stations(count):
+    stations = Station.objects.bulk_create(
+        Station(
+            name=f'Station {i:05d}',
+            latitude=40.44 + i / 100000,
+            longitude=-79.99 - i / 100000,
+            slots=20,
+        )
+        for i in range(count)
+    )
+    StationCurrentStatus.objects.bulk_create(
+        StationCurrentStatus(
+            station=st,
+            updated_at=timezone.now(),
+            free_bikes=st.id % 21,
+            empty_slots=20 - st.id % 21,
+        )
+        for st in stations
+    )
+    return stations
+
+
+def citybikes_payload(stations, free_bikes):
+    return {'network': {'stations': [
+        {'name': st.name, 'free_bikes': free_bikes, 'empty_slots': st.slots - free_bikes}
+        for st in stations
+    ]}}
+
+
+class LatestStatusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='dispatcher', password='pw')
+        self.client.force_login(self.user)
+
+    def count_station_queries(self, station_count):
+        make_stations(station_count)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('stations_api'))
+        self.assertEqual(len(response.json()['stations']), station_count)
+        return len(ctx.captured_queries)
+
+    def test_stations_api_uses_current_status(self):
+        st = make_stations(1)[0]
+        data = self.client.get(reverse('stations_api')).json()['stations'][0]
+        self.assertEqual(data['free_bikes'], st.id % 21)
+        self.assertEqual(data['empty_slots'], 20 - st.id % 21)
+
+    def test_unscraped_station_falls_back_to_slots(self):
+        st = Station.objects.create(name='Empty', latitude=40.4, longitude=-79.9, slots=12)
+        data = self.client.get(reverse('station_detail_api', args=[st.id])).json()
+        self.assertEqual(data['free_bikes'], 0)
+        self.assertEqual(data['empty_slots'], 12)
+        self.assertEqual(data['status'], 'bad_empty')
+
+    def test_query_count_is_constant_in_station_count(self):
+        small = self.count_station_queries(60)
+        Station.objects.all().delete()
+        cache.clear()
+        large = self.count_station_queries(5000)
+        self.assertEqual(small, large)
+
+
+class StationsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cached', password='pw')
+        self.client.force_login(self.user)
+        self.stations = make_stations(3)
+
+    def dashboard_queries(self, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('stations_api'), **headers)
+        return response, [q['sql'] for q in ctx.captured_queries if 'dashboard_' in q['sql']]
+
+    def test_body_is_served_from_cache_between_scrapes(self):
+        first, _ = self.dashboard_queries()
+        second, queries = self.dashboard_queries()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(queries, [])
+
+    def test_scrape_invalidates_cached_body(self):
+        self.client.get(reverse('stations_api'))
+        rows = citybikes_payload(self.stations, 7)['network']['stations']
+        with self.captureOnCommitCallbacks(execute=True):
+            views.ingest_station_statuses(rows)
+
+        data = self.client.get(reverse('stations_api')).json()['stations']
+        self.assertEqual({st['free_bikes'] for st in data}, {7})
+
+    def test_current_etag_gets_empty_304(self):
+        response = self.client.get(reverse('stations_api'))
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        response, queries = self.dashboard_queries(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(queries, [])
+
+        rows = citybikes_payload(self.stations, 7)['network']['stations']
+        with self.captureOnCommitCallbacks(execute=True):
+            views.ingest_station_statuses(rows)
+        response = self.client.get(reverse('stations_api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class StationFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='mobile', password='pw')
+        self.client.force_login(self.user)
+        # a 10 x 10 lattice, 0.005 degrees apart, with one empty station per row
+        self.stations = Station.objects.bulk_create(
+            Station(name=f'Grid {row}-{col}', latitude=40.40 + row * 0.005,
+                    longitude=-80.00 + col * 0.005, slots=10)
+            for row in range(10) for col in range(10)
+        )
+        StationCurrentStatus.objects.bulk_create(
+            StationCurrentStatus(station=st, updated_at=timezone.now(),
+                                 free_bikes=0 if st.name.endswith('-0') else 5, empty_slots=5)
+            for st in self.stations
+        )
+
+    def get_stations(self, **params):
+        response = self.client.get(reverse('stations_api'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['stations']
+
+    def test_bbox_returns_only_stations_inside(self):
+        data = self.get_stations(bbox='-79.9990,40.4040,-79.9840,40.4160')
+        self.assertEqual(
+            [st['name'] for st in data],
+            sorted(f'Grid {row}-{col}' for row in (1, 2, 3) for col in (1, 2, 3)),
+        )
+
+    def test_status_and_fields_filters(self):
+        data = self.get_stations(status='bad_empty', fields='name,free_bikes')
+        self.assertEqual(len(data), 10)
+        self.assertEqual(set(data[0]), {'id', 'name', 'free_bikes'})
+        self.assertEqual({st['free_bikes'] for st in data}, {0})
+
+    def test_invalid_filters_are_rejected(self):
+        for params in (
+            {'bbox': '1,2,3'}, {'bbox': '0,50,1,40'}, {'bbox': 'nan,nan,nan,nan'},
+            {'bbox': '-inf,-inf,inf,inf'}, {'bbox': '-1e308,-1e308,1e308,1e308'},
+            {'bbox': '-80,40,-79,91'}, {'bbox': '-181,40,-79,41'},
+            {'status': 'broken'}, {'fields': 'secret'},
+        ):
+            with self.subTest(params):
+                response = self.client.get(reverse('stations_api'), params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_grid_matches_a_full_scan(self):
+        payload = self.get_stations()
+        grid = StationGrid(payload, cell_degrees=0.007)
+        for bbox in ((40.40, -80.0, 40.42, -79.98), (40.0, -81.0, 41.0, -79.0), (40.41, -79.99, 40.41, -79.99)):
+            south, west, north, east = bbox
+            expected = [
+                st for st in payload
+                if south <= st['latitude'] <= north and west <= st['longitude'] <= east
+            ]
+            self.assertEqual(grid.within(*bbox), expected)
+
+
+class IngestTests(TestCase):
+    def ingest(self, payload):
+        with mock.patch.object(views, 'fetch_data', return_value=payload):
+            views.set_station_status_log()
+
+    def test_ingest_upserts_current_status(self):
+        stations = make_stations(3)
+        self.ingest(citybikes_payload(stations, 5))
+        self.ingest(citybikes_payload(stations, 7))
+
+        self.assertEqual(StationCurrentStatus.objects.count(), 3)
+        self.assertEqual(
+            set(StationCurrentStatus.objects.values_list('free_bikes', flat=True)), {7}
+        )
+        self.assertEqual(StationSnapshot.objects.count(), 6)
+
+    def test_unknown_station_names_are_skipped(self):
+        stations = make_stations(1)
+        payload = citybikes_payload(stations, 4)
+        payload['network']['stations'].append(
+            {'name': 'Not a station', 'free_bikes': 1, 'empty_slots': 1}
+        )
+        self.ingest(payload)
+        self.assertEqual(StationCurrentStatus.objects.get().free_bikes, 4)
+
+    def test_scrape_shares_one_timestamp_and_is_idempotent(self):
+        stations = make_stations(4)
+        scraped_at = timezone.now()
+        rows = citybikes_payload(stations, 2)['network']['stations']
+
+        self.assertEqual(views.ingest_station_statuses(rows, scraped_at), 4)
+        self.assertEqual(views.ingest_station_statuses(rows, scraped_at), 0)
+
+        self.assertEqual(StationSnapshot.objects.filter(timestamp=scraped_at).count(), 4)
+        self.assertEqual(
+            set(StationCurrentStatus.objects.values_list('updated_at', flat=True)), {scraped_at}
+        )
+
+    def test_ingest_query_count_does_not_grow_per_row(self):
+        stations = make_stations(views.INGEST_BATCH_SIZE)
+        rows = citybikes_payload(stations, 1)['network']['stations']
+        with CaptureQueriesContext(connection) as ctx:
+            views.ingest_station_statuses(rows)
+        # a fixed set of lookups plus a handful of batched inserts/upserts
+        # per table (SQLite caps the parameters per statement)
+        self.assertLess(len(ctx.captured_queries), views.INGEST_BATCH_SIZE // 10)
+
+
+class StubCityBikes(BaseHTTPRequestHandler):
+    """
+    Serves the payload set on the server, honouring If-None-Match.
+    """
+    def do_GET(self):
+        server = self.server
+        server.hits += 1
+        if server.status != 200:
+            self.send_response(server.status)
+            self.end_headers()
+            return
+        body = json.dumps(server.payload).encode()
+        etag = f'"{hash(body)}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class CollectorTests(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubCityBikes)
+        self.server.hits = 0
+        self.server.status = 200
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.stations = make_stations(3)
+        self.server.payload = citybikes_payload(self.stations, 6)
+        url = f'http://127.0.0.1:{self.server.server_address[1]}/'
+        self.collector = SnapshotCollector(url=url, interval=0.01, base_backoff=1, max_backoff=8)
+        self.addCleanup(self.collector.close)
+
+    def test_unchanged_feed_is_skipped(self):
+        self.assertEqual(async_to_sync(self.collector.run_once)(), 3)
+        self.assertEqual(async_to_sync(self.collector.run_once)(), 0)
+        self.assertEqual(self.server.hits, 2)
+        self.assertEqual(StationSnapshot.objects.count(), 3)
+
+        self.server.payload = citybikes_payload(self.stations, 9)
+        self.assertEqual(async_to_sync(self.collector.run_once)(), 3)
+        self.assertEqual(StationCurrentStatus.objects.filter(free_bikes=9).count(), 3)
+
+    def test_failed_ingest_is_fetched_again(self):
+        with mock.patch('dashboard.collector.ingest_station_statuses', side_effect=RuntimeError('database is locked')):
+            with self.assertRaises(RuntimeError):
+                async_to_sync(self.collector.run_once)()
+        self.assertIsNone(self.collector.etag)
+
+        self.assertEqual(async_to_sync(self.collector.run_once)(), 3)
+        self.assertEqual(self.server.hits, 2)
+        self.assertEqual(StationSnapshot.objects.count(), 3)
+
+    def test_failures_back_off_with_jitter(self):
+        self.server.status = 503
+        with self.assertRaises(Exception):
+            async_to_sync(self.collector.run_once)()
+
+        for failures, cap in ((1, 1), (3, 4), (10, 8)):
+            self.collector.failures = failures
+            delays = [self.collector.backoff_delay() for _ in range(50)]
+            self.assertTrue(all(0 <= d <= cap for d in delays))
+            self.assertGreater(len(set(delays)), 1)
+
+
+class StationStatusConsumerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='dispatcher', password='pw')
+        self.stations = make_stations(3)
+
+    def ingest(self, free_by_station):
+        rows = [
+            {'name': st.name, 'free_bikes': free, 'empty_slots': st.slots - free}
+            for st, free in zip(self.stations, free_by_station)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            views.ingest_station_statuses(rows)
+
+    async def connect(self):
+        communicator = WebsocketCommunicator(StationStatusConsumer.as_asgi(), '/dashboard/stations')
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_only_changed_stations_are_pushed(self):
+        first, second, third = self.stations
+        current = {st.id: st.id % 21 for st in self.stations}
+        communicator = await self.connect()
+
+        await sync_to_async(self.ingest)([current[first.id], 0, current[third.id]])
+        message = await communicator.receive_json_from()
+
+        self.assertEqual(message['action'], 'station_delta')
+        self.assertEqual(message['stations'], [
+            {'id': second.id, 'free_bikes': 0, 'empty_slots': 20, 'pct_full': 0, 'status': 'bad_empty'}
+        ])
+        await communicator.disconnect()
+
+    async def test_unchanged_scrape_sends_nothing(self):
+        communicator = await self.connect()
+        await sync_to_async(self.ingest)([st.id % 21 for st in self.stations])
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+
+class CommentConsumerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='rider', password='pw', first_name='Riley')
+        self.station, self.other = make_stations(2)
+        self.application = URLRouter(routing.websocket_urlpatterns)
+
+    async def connect(self, station):
+        communicator = WebsocketCommunicator(self.application, f'/dashboard/data/{station.id}')
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator, await communicator.receive_json_from()
+
+    def add_comments(self, station, count):
+        return Comment.objects.bulk_create(
+            Comment(commented_to=station, commentor=self.user, content=f'c{i}',
+                    name='Riley', creation_time=timezone.now())
+            for i in range(count)
+        )
+
+    async def test_initial_snapshot_is_paginated_per_station(self):
+        await sync_to_async(self.add_comments)(self.station, 25)
+        await sync_to_async(self.add_comments)(self.other, 3)
+
+        communicator, page = await self.connect(self.station)
+        self.assertEqual(page['action'], 'comments')
+        self.assertEqual(len(page['comments']), 20)
+        self.assertTrue(page['has_more'])
+        self.assertEqual({c['commented_to_id'] for c in page['comments']}, {self.station.id})
+
+        await communicator.send_json_to({'action': 'load_comments', 'before': page['comments'][0]['id']})
+        older = await communicator.receive_json_from()
+        self.assertEqual(len(older['comments']), 5)
+        self.assertFalse(older['has_more'])
+        await communicator.disconnect()
+
+    async def test_new_comment_and_reply_reach_only_that_station(self):
+        viewer, _ = await self.connect(self.station)
+        author, _ = await self.connect(self.station)
+        elsewhere, _ = await self.connect(self.other)
+
+        await author.send_json_to({'action': 'add_comment', 'text': 'Dock 4 jammed'})
+        for communicator in (viewer, author):
+            message = await communicator.receive_json_from()
+            self.assertEqual(message['action'], 'comment_added')
+            self.assertEqual(message['comment']['content'], 'Dock 4 jammed')
+        self.assertTrue(await elsewhere.receive_nothing())
+
+        comment_id = message['comment']['id']
+        await viewer.send_json_to({'action': 'add_reply', 'text': 'On it', 'id': comment_id})
+        message = await author.receive_json_from()
+        self.assertEqual(message['action'], 'reply_added')
+        self.assertEqual(message['reply']['replied_to_id'], comment_id)
+        self.assertEqual(await sync_to_async(Reply.objects.count)(), 1)
+
+        for communicator in (viewer, author, elsewhere):
+            await communicator.disconnect()
+
+    async def test_unknown_station_is_refused(self):
+        communicator = WebsocketCommunicator(self.application, '/dashboard/data/999')
+        communicator.scope['user'] = self.user
+        await communicator.connect()
+        self.assertEqual(await communicator.receive_json_from(), {'error': 'station does not exist'})
+        self.assertEqual((await communicator.receive_output())['type'], 'websocket.close')
+        self.assertEqual(await sync_to_async(Comment.objects.count)(), 0)
+
+    async def test_malformed_ids_get_errors(self):
+        communicator, _ = await self.connect(self.station)
+        for message in (
+            {'action': 'load_comments', 'before': 'abc'},
+            {'action': 'load_comments', 'before': True},
+            {'action': 'add_reply', 'text': 'On it', 'id': 'abc'},
+            {'action': 'add_reply', 'text': 'On it'},
+            {'action': 'add_comment', 'text': {'a': 1}},
+            {'action': 'add_comment', 'text': '   '},
+            {'action': 'add_comment', 'text': 'x' * 201},
+            {'action': 'add_reply', 'text': ['On it'], 'id': 1},
+            {'action': 'add_reply', 'text': 'x' * 201, 'id': 1},
+        ):
+            await communicator.send_json_to(message)
+            self.assertIn('error', await communicator.receive_json_from())
+
+        self.assertEqual(await sync_to_async(Comment.objects.count)(), 0)
+
+        # the socket is still usable
+        await communicator.send_json_to({'action': 'load_comments', 'before': 1})
+        self.assertEqual((await communicator.receive_json_from())['action'], 'comments')
+        await communicator.send_json_to({'action': 'add_comment', 'text': ' Dock 4 jammed '})
+        self.assertEqual((await communicator.receive_json_from())['comment']['content'], 'Dock 4 jammed')
+        await communicator.disconnect()
+
+
+class TourConsumerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='loader', password='pw', first_name='Lo')
+        self.station, self.other = make_stations(2)
+        self.tour = Tour.objects.create(due_date=date(2025, 11, 18), assigned_to=self.user)
+        self.application = URLRouter(routing.websocket_urlpatterns)
+
+    async def open(self, path):
+        communicator = WebsocketCommunicator(self.application, path)
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def test_create_tour_bulk_writes_everything_and_broadcasts_once(self):
+        tour_watcher = await self.open(f'/dashboard/tour/{self.tour.id}')
+        overview = await self.open('/dashboard/tour')
+
+        await overview.send_json_to({
+            'action': 'create_tour_bulk', 'date': '2025-11-19', 'user': 'loader',
+            'stops': [
+                {'station_id': self.other.id, 'tasks': ['Deliver 3 bikes', 'Check dock 4']},
+                {'station_id': self.station.id},
+            ],
+        })
+        message = await overview.receive_json_from()
+        self.assertEqual(message['action'], 'tour_changed')
+        self.assertEqual(message['tour']['assigned_to'], 'Lo')
+        self.assertEqual((message['tour']['stops'], message['tour']['tasks']), (2, 2))
+        self.assertTrue(await overview.receive_nothing())
+        self.assertTrue(await tour_watcher.receive_nothing())
+
+        @sync_to_async
+        def stored():
+            tour = Tour.objects.get(pk=message['tour']['id'])
+            return (
+                tour.assigned_to_id,
+                list(tour.stop_set.order_by('order').values_list('station_id', flat=True)),
+                list(Task.objects.filter(stop__tour=tour).values_list('content', flat=True)),
+            )
+        self.assertEqual(await stored(), (
+            self.user.id, [self.other.id, self.station.id], ['Deliver 3 bikes', 'Check dock 4'],
+        ))
+
+        await tour_watcher.disconnect()
+        await overview.disconnect()
+
+    async def test_create_tour_bulk_rejects_invalid_tours(self):
+        overview = await self.open('/dashboard/tour')
+        invalid = [
+            {'date': 'tomorrow', 'user': 'loader', 'stops': [{'station_id': self.station.id}]},
+            {'date': '2025-02-30', 'user': 'loader', 'stops': [{'station_id': self.station.id}]},
+            {'date': 20251119, 'user': 'loader', 'stops': [{'station_id': self.station.id}]},
+            {'date': '2025-11-19', 'user': 'loader', 'stops': [{'station_id': 2 ** 70}]},
+            {'date': '2025-11-19', 'user': 'loader', 'stops': [{'station_id': True}]},
+            {'date': '2025-11-19', 'user': 'nobody', 'stops': [{'station_id': self.station.id}]},
+            {'date': '2025-11-19', 'user': 'loader', 'stops': []},
+            {'date': '2025-11-19', 'user': 'loader', 'stops': [{'station_id': 999}]},
+            {'date': '2025-11-19', 'user': 'loader', 'stops': [{'station_id': self.station.id, 'tasks': 'x'}]},
+        ]
+        for data in invalid:
+            await overview.send_json_to({'action': 'create_tour_bulk', **data})
+            message = await overview.receive_json_from()
+            self.assertIn('error', message)
+
+        count = await sync_to_async(Tour.objects.count)()
+        self.assertEqual(count, 1)
+        await overview.disconnect()
+
+    async def test_create_tour_looks_up_the_assignee(self):
+        overview = await self.open('/dashboard/tour')
+
+        await overview.send_json_to({'action': 'create_tour', 'date': '2025-11-19'})
+        self.assertEqual(await overview.receive_json_from(), {'error': 'missing json properties'})
+        await overview.send_json_to({'action': 'create_tour', 'date': '2025-11-19', 'user': 'nobody'})
+        self.assertIn('error', await overview.receive_json_from())
+        for date in ('2025-02-30', 'tomorrow', 20251119):
+            await overview.send_json_to({'action': 'create_tour', 'date': date, 'user': 'loader'})
+            self.assertIn('error', await overview.receive_json_from())
+
+        await overview.send_json_to({'action': 'create_tour', 'date': '2025-11-19', 'user': 'loader'})
+        message = await overview.receive_json_from()
+        self.assertEqual(message['action'], 'tour_created')
+        await overview.disconnect()
+
+
+    async def test_malformed_stops_and_tasks_get_errors(self):
+        stop = await sync_to_async(Stop.objects.create)(tour=self.tour, station=self.station, order=1)
+        watcher = await self.open(f'/dashboard/tour/{self.tour.id}')
+        stop_fields = {'tour_id': self.tour.id, 'station_id': self.station.id, 'order': 2}
+        for message in (
+            {'action': 'add_stop', **stop_fields, 'tour_id': 'abc'},
+            {'action': 'add_stop', **stop_fields, 'station_id': 2 ** 70},
+            {'action': 'add_stop', **stop_fields, 'order': -1},
+            {'action': 'add_stop', **stop_fields, 'order': True},
+            {'action': 'add_task', 'stop_id': 'x', 'text': 'Check dock 4'},
+            {'action': 'add_task', 'stop_id': stop.id, 'text': {'a': 1}},
+            {'action': 'add_task', 'stop_id': stop.id, 'text': '   '},
+            {'action': 'add_task', 'stop_id': stop.id, 'text': 'x' * 401},
+        ):
+            await watcher.send_json_to(message)
+            self.assertIn('error', await watcher.receive_json_from())
+
+        # the socket is still usable
+        await watcher.send_json_to({'action': 'add_task', 'stop_id': stop.id, 'text': ' Check dock 4 '})
+        message = await watcher.receive_json_from()
+        self.assertEqual((message['action'], message['task']['content']), ('task_added', 'Check dock 4'))
+        self.assertEqual(await sync_to_async(Stop.objects.count)(), 1)
+        await watcher.disconnect()
+
+
+class SerializerQueryCountTests(TestCase):
+    def seed(self, count):
+        user = User.objects.create_user(username=f'ops{count}', password='pw', first_name='Ops')
+        station = make_stations(1)[0]
+        now = timezone.now()
+        comments = Comment.objects.bulk_create(
+            Comment(commented_to=station, commentor=user, content='c', name='Ops', creation_time=now)
+            for _ in range(count)
+        )
+        Reply.objects.bulk_create(
+            Reply(reply_to=c, replier=user, content='r', name='Ops', creation_time=now)
+            for c in comments
+        )
+        tours = Tour.objects.bulk_create(
+            Tour(due_date=date(2025, 11, 18), assigned_to=user) for _ in range(count)
+        )
+        stops = Stop.objects.bulk_create(
+            Stop(tour=tour, station=station, order=1) for tour in tours
+        )
+        Task.objects.bulk_create(Task(stop=stop, content='t') for stop in stops)
+
+    def test_make_lists_use_one_query_at_any_size(self):
+        for count in (10, 10000):
+            self.seed(count)
+            for model, make_list in (
+                (Comment, Comment.make_comment_list),
+                (Reply, Reply.make_reply_list),
+                (Tour, Tour.make_tour_list),
+                (Stop, Stop.make_stop_list),
+                (Task, Task.make_task_list),
+            ):
+                with self.subTest(model=model.__name__, count=count):
+                    with self.assertNumQueries(1):
+                        rows = make_list(model.objects.order_by('-id')[:count])
+                    self.assertEqual(len(rows), count)
+            for model in (Task, Stop, Tour, Reply, Comment):
+                model.objects.all().delete()
+
+    def test_related_fields_are_flattened(self):
+        self.seed(1)
+        self.assertEqual(Stop.make_stop_list()[0]['tour_date'], '2025-11-18')
+        self.assertEqual(Task.make_task_list()[0]['stop_name'], 'Station 00000')
+        self.assertEqual(Comment.make_comment_list()[0]['commentor'], 'Ops')
+
+
+class ChannelFanOutLoadTests(TestCase):
+    """
+    N simulated clients: every connection gets its own channel, and only
+    the members of a group receive its traffic.
+    """
+    clients = 50
+    messages = 5
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='loader', password='pw', first_name='Lo')
+        self.station, self.other = make_stations(2)
+        self.tour = Tour.objects.create(due_date=date(2025, 11, 18), assigned_to=self.user)
+        self.application = URLRouter(routing.websocket_urlpatterns)
+
+    async def open(self, path, greeting=False):
+        communicator = WebsocketCommunicator(self.application, path)
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        if greeting:
+            await communicator.receive_json_from()
+        return communicator
+
+    async def test_station_fan_out_latency_and_message_count(self):
+        listeners = [
+            await self.open(f'/dashboard/data/{self.station.id}', greeting=True)
+            for _ in range(self.clients)
+        ]
+        bystanders = [
+            await self.open(f'/dashboard/data/{self.other.id}', greeting=True)
+            for _ in range(5)
+        ]
+        received = [0] * self.clients
+        latencies = []
+
+        async def drain(index, communicator, sent_at):
+            message = await communicator.receive_json_from(timeout=5)
+            latencies.append(perf_counter() - sent_at)
+            self.assertEqual(message['action'], 'comment_added')
+            received[index] += 1
+
+        for i in range(self.messages):
+            sent_at = perf_counter()
+            await listeners[0].send_json_to({'action': 'add_comment', 'text': f'load {i}'})
+            await asyncio.gather(*(
+                drain(index, communicator, sent_at)
+                for index, communicator in enumerate(listeners)
+            ))
+
+        self.assertEqual(received, [self.messages] * self.clients)
+        for communicator in bystanders:
+            self.assertTrue(await communicator.receive_nothing())
+
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        self.assertLess(p99, 2.0)
+
+        for communicator in listeners + bystanders:
+            await communicator.disconnect()
+
+    async def test_tour_events_stay_in_their_group(self):
+        tour_watcher = await self.open(f'/dashboard/tour/{self.tour.id}')
+        overview = await self.open('/dashboard/tour')
+
+        await overview.send_json_to({
+            'action': 'add_stop', 'tour_id': self.tour.id, 'station_id': self.station.id, 'order': 1,
+        })
+        message = await tour_watcher.receive_json_from()
+        self.assertEqual(message['action'], 'stop_added')
+        self.assertEqual(message['stop']['station_name'], self.station.name)
+        self.assertTrue(await overview.receive_nothing())
+
+        await tour_watcher.disconnect()
+        await overview.disconnect()
+
+
+class SharedInMemoryChannelLayer(InMemoryChannelLayer):
+    """
+    Stand-in for a networked layer such as Redis: every instance created
+    with the same `broker` shares one set of channels and groups.
+    """
+    brokers = {}
+
+    def __init__(self, broker='default', **kwargs):
+        super().__init__(**kwargs)
+        self.channels, self.groups = self.brokers.setdefault(broker, ({}, {}))
+
+
+SHARED_LAYER = 'dashboard.tests.SharedInMemoryChannelLayer'
+
+
+@override_settings(CHANNEL_LAYERS={
+    'default': {'BACKEND': SHARED_LAYER, 'CONFIG': {'broker': 'multi-worker'}},
+    'worker_a': {'BACKEND': SHARED_LAYER, 'CONFIG': {'broker': 'multi-worker'}},
+    'worker_b': {'BACKEND': SHARED_LAYER, 'CONFIG': {'broker': 'multi-worker'}},
+})
+class MultiWorkerChannelLayerTests(TestCase):
+    def setUp(self):
+        SharedInMemoryChannelLayer.brokers.clear()
+        self.user = User.objects.create_user(username='worker', password='pw', first_name='W')
+        self.station = make_stations(1)[0]
+
+    @staticmethod
+    def worker_application(alias):
+        # one ASGI app per simulated Daphne worker, each with its own layer instance
+        consumer = type(f'{alias}CommentConsumer', (CommentConsumer,), {'channel_layer_alias': alias})
+        return URLRouter([path('dashboard/data/<int:station_id>', consumer.as_asgi())])
+
+    async def open(self, application):
+        communicator = WebsocketCommunicator(application, f'/dashboard/data/{self.station.id}')
+        communicator.scope['user'] = self.user
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_json_from()
+        return communicator
+
+    async def test_comment_posted_on_one_worker_reaches_the_other(self):
+        worker_a = self.worker_application('worker_a')
+        worker_b = self.worker_application('worker_b')
+        poster = await self.open(worker_a)
+        reader = await self.open(worker_b)
+
+        await poster.send_json_to({'action': 'add_comment', 'text': 'Cross-worker hello'})
+        message = await reader.receive_json_from()
+        self.assertEqual(message['action'], 'comment_added')
+        self.assertEqual(message['comment']['content'], 'Cross-worker hello')
+
+        await poster.disconnect()
+        await reader.disconnect()
+
+
+class StationTrendTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user(username='trender', password='pw'))
+        self.station = make_stations(1)[0]
+        self.day = datetime(2025, 11, 18, tzinfo=dt_timezone.utc)
+        # one snapshot every minute for two hours: free bikes = minute of hour
+        StationSnapshot.objects.bulk_create(
+            StationSnapshot(
+                station=self.station,
+                timestamp=self.day + timedelta(minutes=m),
+                free_bikes=m % 60,
+                empty_slots=20,
+            )
+            for m in range(120)
+        )
+        call_command('rebuild_rollups', ignore_retention=True, stdout=io.StringIO())
+
+    def trend(self, **params):
+        return self.client.get(reverse('station_trend', args=[self.station.id]), params)
+
+    def test_five_minute_buckets(self):
+        data = self.trend(start='2025-11-18T00:00:00Z', end='2025-11-18T02:00:00Z', granularity='5m').json()
+        self.assertEqual(data['granularity'], '5m')
+        self.assertEqual(len(data['series']), 24)
+        self.assertEqual(data['series'][1], {'ts': '2025-11-18T00:05:00+00:00', 'free': 7.0})
+
+    def test_default_window_is_last_day_in_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.trend(end='2025-11-19').json()
+        # besides the session and user lookups of the login check
+        self.assertEqual(len([q for q in ctx.captured_queries if 'dashboard_' in q['sql']]), 1)
+        self.assertEqual(data['granularity'], '5m')
+        self.assertEqual(data['start'], '2025-11-18T00:00:00+00:00')
+        hourly = self.trend(end='2025-11-19', granularity='hour').json()['series']
+        self.assertEqual([p['free'] for p in hourly], [29.5, 29.5])
+
+    def test_granularity_is_coarsened_to_bound_points(self):
+        data = self.trend(start='2025-01-01', end='2025-12-31', granularity='5m').json()
+        self.assertEqual(data['granularity'], 'day')
+        self.assertEqual(data['series'], [{'ts': '2025-11-18T00:00:00+00:00', 'free': 29.5}])
+        week = self.trend(start='2025-11-12', end='2025-11-19').json()
+        self.assertEqual(week['granularity'], 'hour')
+
+    def test_offset_start_includes_the_utc_bucket(self):
+        # 00:00-05:00 is 05:00Z and 06:00+05:30 is 00:30Z; both fall inside
+        # a bucket that starts at a UTC boundary
+        day = self.trend(start='2025-11-18T00:00:00-05:00', end='2025-11-20T00:00:00-05:00', granularity='day')
+        self.assertEqual(day.json()['series'], [{'ts': '2025-11-18T00:00:00+00:00', 'free': 29.5}])
+        hour = self.trend(start='2025-11-18T06:00:00+05:30', end='2025-11-18T07:30:00+05:30', granularity='hour')
+        self.assertEqual([p['ts'] for p in hour.json()['series']], ['2025-11-18T00:00:00+00:00', '2025-11-18T01:00:00+00:00'])
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.trend(end='2025-11-19').status_code, 302)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.trend(start='yesterday').status_code, 400)
+        self.assertEqual(self.trend(granularity='week').status_code, 400)
+        self.assertEqual(self.trend(start='2025-11-19', end='2025-11-18').status_code, 400)
+        self.assertEqual(self.trend(start='2020-01-01', end='2025-01-01').status_code, 400)
+
+
+class BulkTrendTests(TestCase):
+    def setUp(self):
+        self.stations = make_stations(25)
+        start = datetime(2025, 11, 18, tzinfo=dt_timezone.utc)
+        StationSnapshot.objects.bulk_create(
+            StationSnapshot(station=st, timestamp=start + timedelta(minutes=m),
+                            free_bikes=(st.id + m) % 20, empty_slots=5)
+            for st in self.stations[:3] for m in range(0, 120, 5)
+        )
+        self.params = {'start': '2025-11-18', 'end': '2025-11-18T02:00:00Z', 'granularity': '15m'}
+        self.user = User.objects.create_user(username='analyst', password='pw')
+        self.client.force_login(self.user)
+
+    def bulk(self, ids, **params):
+        return self.client.get(
+            reverse('stations_trend'), {**self.params, 'ids': ','.join(map(str, ids)), **params}
+        )
+
+    def test_matches_single_station_trends_in_one_query(self):
+        ids = [st.id for st in self.stations[:3]]
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.bulk(ids).json()
+        self.assertEqual(len([q for q in ctx.captured_queries if 'dashboard_' in q['sql']]), 1)
+        self.assertEqual([entry['id'] for entry in data['stations']], ids)
+        for entry in data['stations']:
+            single = self.client.get(reverse('station_trend', args=[entry['id']]), self.params).json()
+            self.assertEqual(entry['series'], single['series'])
+            self.assertEqual(len(entry['series']), 8)
+
+    def test_pages_of_stations(self):
+        ids = [st.id for st in self.stations]
+        first = self.bulk(ids).json()
+        self.assertEqual((first['page'], first['pages'], len(first['stations'])), (1, 2, 20))
+        second = self.bulk(ids, page=2).json()
+        self.assertEqual([entry['id'] for entry in second['stations']], ids[20:])
+        self.assertEqual({len(entry['series']) for entry in second['stations']}, {0})
+
+    def test_invalid_requests(self):
+        too_many = range(1, views.MAX_BULK_TREND_STATIONS + 2)
+        for ids, params in (
+            ([], {}), (['a'], {}), (too_many, {}), ([1], {'page': 2}), ([1], {'page': 'x'}),
+            ([99999999999999999999999], {}), ([0], {}), ([-1], {}),
+        ):
+            with self.subTest(ids=ids, params=params):
+                self.assertEqual(self.bulk(ids, **params).status_code, 400)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.bulk([self.stations[0].id]).status_code, 302)
+
+
+class NetworkAnalyticsTests(TestCase):
+    def setUp(self):
+        if analytics.np is None:
+            self.skipTest('numpy is not installed')
+        self.user = User.objects.create_user(username='analyst', password='pw')
+        self.client.force_login(self.user)
+        self.busy, self.full, self.unseen = make_stations(3)
+        self.start = datetime(2025, 11, 18, 8, tzinfo=dt_timezone.utc)
+        rows = [(self.busy, m, free) for m, free in ((0, 4), (1, 0), (2, 0), (3, 2))]
+        rows.append((self.full, 1, 10))
+        StationSnapshot.objects.bulk_create(
+            StationSnapshot(station=st, timestamp=self.start + timedelta(minutes=m),
+                            free_bikes=free, empty_slots=10 - free)
+            for st, m, free in rows
+        )
+
+    def analytics(self, **params):
+        params = {'start': self.start.isoformat(), 'end': (self.start + timedelta(minutes=4)).isoformat(), **params}
+        return self.client.get(reverse('network_analytics'), params)
+
+    def test_station_metrics(self):
+        data = self.analytics().json()
+        busy, full, unseen = data['stations']
+        self.assertEqual(
+            busy,
+            {'id': self.busy.id, 'pct_time_empty': 50.0, 'pct_time_full': 0.0,
+             'turnover': 6.0, 'rebalancing_need': 0.0},
+        )
+        # first seen in the second minute, then carried forward
+        self.assertEqual((full['pct_time_full'], full['turnover'], full['rebalancing_need']), (100.0, 0.0, -3.0))
+        self.assertEqual(set(unseen.values()), {self.unseen.id, None})
+        self.assertEqual(
+            data['network'],
+            {'stations_observed': 2, 'pct_time_empty': 25.0, 'pct_time_full': 50.0,
+             'turnover': 6.0, 'bikes_to_deliver': 0, 'bikes_to_collect': 3},
+        )
+
+    def test_bucket_keeps_its_last_snapshot(self):
+        matrix = analytics.load_station_matrix(
+            self.start, self.start + timedelta(minutes=10), timedelta(minutes=5), [self.busy.id]
+        )
+        self.assertEqual(matrix.shape, (1, 2))
+        self.assertEqual(matrix.free.tolist(), [[2.0, 2.0]])
+
+    def test_invalid_window_or_step(self):
+        for params in ({'step': '2m'}, {'end': '2025-12-01'}, {'start': 'yesterday'}):
+            with self.subTest(params):
+                self.assertEqual(self.analytics(**params).status_code, 400)
+
+    def test_step_coarsens_to_fit_the_cell_budget(self):
+        self.assertEqual(self.analytics().json()['step'], '1m')
+        # 3 stations x 4 one-minute buckets do not fit, one 5 minute bucket does
+        with mock.patch.object(views, 'MAX_ANALYTICS_CELLS', 6):
+            self.assertEqual(self.analytics().json()['step'], '5m')
+        with mock.patch.object(views, 'MAX_ANALYTICS_CELLS', 2):
+            self.assertEqual(self.analytics().status_code, 400)
+
+    def test_numpy_metrics_match_the_orm_loop(self):
+        result = benchmarks.compare_station_metrics(self.start, self.start + timedelta(minutes=4), timedelta(minutes=1))
+        self.assertEqual((result['stations'], result['columns']), (3, 4))
+
+
+class ForecastTests(TestCase):
+    def setUp(self):
+        self.stations = make_stations(2)
+        # a Monday, so hour of week = hour of day
+        self.start = datetime(2025, 11, 17, tzinfo=dt_timezone.utc)
+
+    def test_minutes_until_walks_hourly_rates(self):
+        at_hour = self.start
+        self.assertEqual(analytics.minutes_until(10, 20, [-0.5] * 25, at_hour), (20, None))
+        self.assertEqual(analytics.minutes_until(18, 20, [0.1] * 25, at_hour), (None, 20))
+        self.assertEqual(analytics.minutes_until(10, 20, [0.0] * 25, at_hour), (None, None))
+        half_past = at_hour + timedelta(minutes=30)
+        self.assertEqual(analytics.minutes_until(10, 20, [0.0, -1.0] + [0.0] * 23, half_past), (40, None))
+        # empties in the first hour, then refills within the horizon
+        self.assertEqual(analytics.minutes_until(2, 4, [-1.0, 1.0] + [0.0] * 23, at_hour), (2, 64))
+
+    def test_ingest_updates_the_scrape_hour(self):
+        st = self.stations[0]
+        scraped_at = self.start + timedelta(hours=9, minutes=1)
+        StationCurrentStatus.objects.filter(station=st).update(
+            updated_at=scraped_at - timedelta(minutes=2), free_bikes=6, empty_slots=14
+        )
+        views.ingest_station_statuses(citybikes_payload([st], 4)['network']['stations'], scraped_at)
+        # an hour later the gap is too long to count
+        views.ingest_station_statuses(citybikes_payload([st], 9)['network']['stations'], scraped_at + timedelta(hours=1))
+
+        baseline = StationSeasonalBaseline.objects.get()
+        self.assertEqual((baseline.hour_of_week, baseline.flow, baseline.minutes), (9, -2, 2.0))
+        self.assertEqual(baseline.rate, -1.0)
+
+    def test_updates_add_to_the_stored_values_in_the_database(self):
+        stations = make_stations(200)
+        scraped_at = self.start + timedelta(hours=9)
+        # another collector already credited this hour
+        StationSeasonalBaseline.objects.create(station=stations[0], hour_of_week=9, flow=5, minutes=10)
+        with CaptureQueriesContext(connection) as ctx:
+            analytics.update_baselines(scraped_at, [
+                (st.id, scraped_at - timedelta(minutes=1 + i % 3), 10, 10 - i % 4)
+                for i, st in enumerate(stations)
+            ])
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+        self.assertIn('"flow" + CASE', ctx.captured_queries[-1]['sql'])
+
+        rows = {
+            station_id: (flow, minutes)
+            for station_id, flow, minutes in StationSeasonalBaseline.objects.values_list('station', 'flow', 'minutes')
+        }
+        self.assertEqual(rows[stations[0].id], (5, 11.0))
+        self.assertEqual(rows[stations[7].id], (-3, 2.0))
+
+    def test_training_matches_incremental_updates(self):
+        if analytics.np is None:
+            self.skipTest('numpy is not installed')
+        levels = {st.id: [(m // 7 + st.id) % 20 for m in range(150)] for st in self.stations}
+        # Sunday 23:00 to Monday 01:30, across a chunk boundary and the week wrap
+        first = self.start - timedelta(hours=1)
+        StationSnapshot.objects.bulk_create(
+            StationSnapshot(station_id=station_id, timestamp=first + timedelta(minutes=m),
+                            free_bikes=free, empty_slots=20 - free)
+            for station_id, series in levels.items() for m, free in enumerate(series)
+        )
+        for m in range(1, 150):
+            moment = first + timedelta(minutes=m)
+            analytics.update_baselines(moment, [
+                (station_id, moment - timedelta(minutes=1), series[m - 1], series[m])
+                for station_id, series in levels.items()
+            ])
+        incremental = list(StationSeasonalBaseline.objects.order_by('station', 'hour_of_week').values_list(
+            'station', 'hour_of_week', 'flow', 'minutes'
+        ))
+
+        out = io.StringIO()
+        call_command('train_forecasts', chunk_days=1, stdout=out)
+        trained = list(StationSeasonalBaseline.objects.order_by('station', 'hour_of_week').values_list(
+            'station', 'hour_of_week', 'flow', 'minutes'
+        ))
+        self.assertEqual(trained, incremental)
+        self.assertEqual({row[1] for row in trained}, {167, 0, 1})
+        self.assertIn('6 baselines trained', out.getvalue())
+
+    def test_stations_api_reports_minutes_until_empty(self):
+        cache.clear()
+        user = User.objects.create_user(username='forecaster', password='pw')
+        self.client.force_login(user)
+        st = self.stations[0]
+        StationSeasonalBaseline.objects.bulk_create(
+            StationSeasonalBaseline(station=st, hour_of_week=hour, flow=-60, minutes=60)
+            for hour in range(168)
+        )
+        data = {row['id']: row for row in self.client.get(reverse('stations_api')).json()['stations']}
+        self.assertEqual(data[st.id]['minutes_until_empty'], st.id % 21)
+        self.assertIsNone(data[st.id]['minutes_until_full'])
+        self.assertIsNone(data[self.stations[1].id]['minutes_until_empty'])
+
+
+class SeedSnapshotsTests(TestCase):
+    def setUp(self):
+        self.stations = make_stations(2)
+        self.start = datetime(2025, 11, 17, tzinfo=dt_timezone.utc)
+
+    def test_seed_generates_days_of_history(self):
+        call_command('seed_dummy_snapshots', date='2025-11-17', days=2, interval=30, stdout=io.StringIO())
+        self.assertEqual(StationSnapshot.objects.count(), 2 * 2 * 48)
+        self.assertEqual(
+            StationSnapshot.objects.filter(timestamp__gte=self.start + timedelta(days=2)).count(), 0
+        )
+
+    def test_seed_tops_up_stations_in_batches(self):
+        out = io.StringIO()
+        call_command('seed_dummy_snapshots', date='2025-11-17', stations=5, batch_size=7, stdout=out)
+        self.assertEqual(Station.objects.count(), 5)
+        self.assertEqual(StationSnapshot.objects.count(), 5 * 24)
+        self.assertIn('rows/s', out.getvalue())
+
+        # scrape order: every station at one timestamp before the next
+        first = StationSnapshot.objects.order_by('id')[:5]
+        self.assertEqual({snapshot.timestamp for snapshot in first}, {self.start})
+
+        # rerunning replaces the range with identical rows
+        before = list(StationSnapshot.objects.order_by('station_id', 'timestamp').values_list('free_bikes', flat=True))
+        call_command('seed_dummy_snapshots', date='2025-11-17', stations=5, stdout=io.StringIO())
+        after = list(StationSnapshot.objects.order_by('station_id', 'timestamp').values_list('free_bikes', flat=True))
+        self.assertEqual(after, before)
+
+    def test_seed_profiles_follow_the_commute(self):
+        self.assertAlmostEqual(commute_profile(3, weekday=True), -1, places=2)
+        self.assertAlmostEqual(commute_profile(13, weekday=True), 1, places=2)
+        self.assertEqual(commute_profile(13, weekday=False), -1)
+        self.assertGreater(leisure_profile(13, weekday=False), leisure_profile(13, weekday=True))
+
+    def test_seed_profiles_use_pittsburgh_time(self):
+        # Monday 2025-11-17 00:00 UTC is Sunday 19:00 in Pittsburgh (EST)
+        profiles = SeedCommand._profiles(self.start, 24, 60)
+        self.assertEqual(profiles[4][1], -1)
+        self.assertAlmostEqual(profiles[9][1], -1, places=2)  # 04:00 EST
+        self.assertAlmostEqual(profiles[13][1], 0, places=2)  # 08:00 EST, the morning peak
+        self.assertAlmostEqual(profiles[18][1], 1, places=2)  # 13:00 EST
+
+
+class RebalancingTests(TestCase):
+    def setUp(self):
+        if rebalancing.np is None:
+            self.skipTest('numpy is not installed')
+
+    def test_haversine_matrix(self):
+        # Pittsburgh to Philadelphia is about 410 km as the crow flies
+        dist = rebalancing.haversine_matrix([40.4406, 39.9526], [-79.9959, -75.1652])
+        self.assertAlmostEqual(dist[0, 1], 410, delta=5)
+        self.assertEqual(dist[0, 1], dist[1, 0])
+        self.assertEqual(dist[0, 0], 0)
+
+    def test_route_on_a_line_is_in_order(self):
+        rng = Random(3)
+        longitudes = [-80 + i / 100 for i in range(30)]
+        shuffled = [0] + rng.sample(range(1, 30), 29)
+        order = rebalancing.optimize_route(
+            [40.44] * 30, [longitudes[i] for i in shuffled], start=0
+        )
+        self.assertEqual([shuffled[i] for i in order], list(range(30)))
+
+    def test_two_opt_improves_500_stations_within_a_second(self):
+        rng = Random(7)
+        lats = [40.38 + rng.random() * 0.12 for _ in range(600)]
+        lons = [-80.05 + rng.random() * 0.15 for _ in range(600)]
+        dist = rebalancing.haversine_matrix(lats, lons)
+        greedy = rebalancing.nearest_neighbour_route(dist)
+
+        started = perf_counter()
+        order = rebalancing.optimize_route(lats, lons, time_budget=0.8)
+        self.assertLess(perf_counter() - started, 1.0)
+        self.assertEqual(sorted(order), list(range(600)))
+        self.assertEqual(order[0], 0)
+        self.assertLess(rebalancing.route_length(order, dist), rebalancing.route_length(greedy, dist))
+
+    def test_plan_writes_ordered_stops_and_tasks(self):
+        user = User.objects.create_user(username='driver', password='pw', first_name='Dee')
+        stations = make_stations(6)
+        levels = [0, 10, 20, 1, 19, 8]
+        for st, free in zip(stations, levels):
+            StationCurrentStatus.objects.filter(station=st).update(free_bikes=free, empty_slots=20 - free)
+
+        out = io.StringIO()
+        call_command('plan_rebalancing_tour', 'driver', date='2025-11-20', stdout=out)
+        tour = Tour.objects.get()
+        self.assertEqual((tour.assigned_to, str(tour.due_date)), (user, '2025-11-20'))
+
+        stops = list(tour.stop_set.order_by('order'))
+        self.assertEqual([stop.order for stop in stops], [1, 2, 3, 4])
+        # the station furthest from the healthy band comes first
+        self.assertEqual(stops[0].station, stations[2])
+        self.assertEqual(
+            {stop.station_id: stop.task_set.get().content for stop in stops},
+            {stations[0].id: 'Deliver 4 bikes', stations[2].id: 'Collect 5 bikes',
+             stations[3].id: 'Deliver 3 bikes', stations[4].id: 'Collect 4 bikes'},
+        )
+        self.assertIn('4 stops planned', out.getvalue())
+
+    def test_need_uses_docks_in_service_like_the_analytics(self):
+        stations = make_stations(2)
+        # half the docks are out of service: 2 of 10 working docks is healthy
+        StationCurrentStatus.objects.filter(station=stations[0]).update(free_bikes=2, empty_slots=8)
+        StationCurrentStatus.objects.filter(station=stations[1]).update(free_bikes=0, empty_slots=10)
+        self.assertEqual(
+            [(station, need) for station, need in rebalancing.stations_needing_rebalancing()],
+            [(stations[1], analytics.rebalancing_need(0, 10))],
+        )
+        self.assertEqual(analytics.rebalancing_need(0, 10), 2)
+
+
+class CompactEncodingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='compact', password='pw')
+        self.client.force_login(self.user)
+        self.station = make_stations(30)[0]
+        start = datetime(2025, 11, 18, tzinfo=dt_timezone.utc)
+        StationSnapshot.objects.bulk_create(
+            StationSnapshot(station=self.station, timestamp=start + timedelta(minutes=m),
+                            free_bikes=m % 7, empty_slots=20)
+            for m in range(0, 600, 5)
+        )
+        self.trend_url = reverse('station_trend', args=[self.station.id])
+        self.trend_params = {'start': '2025-11-18', 'end': '2025-11-18T10:00:00Z', 'granularity': '15m'}
+
+    def test_columnar_stations_match_json(self):
+        rows = self.client.get(reverse('stations_api')).json()['stations']
+        response = self.client.get(reverse('stations_api'), HTTP_ACCEPT=encoding.COLUMNAR)
+        self.assertEqual(response['Content-Type'], encoding.COLUMNAR)
+        self.assertIn('Accept', response['Vary'])
+        table = json.loads(response.content)['stations']
+        self.assertEqual(table, {key: [row[key] for row in rows] for key in views.STATION_FIELDS})
+
+        json_etag = self.client.get(reverse('stations_api'))['ETag']
+        self.assertNotEqual(response['ETag'], json_etag)
+
+    def test_columnar_trend_delta_encodes_timestamps(self):
+        series = self.client.get(self.trend_url, self.trend_params).json()['series']
+        compact = self.client.get(self.trend_url, self.trend_params, HTTP_ACCEPT=encoding.COLUMNAR).json()['series']
+
+        self.assertEqual(set(compact['ts'][1:]), {15 * 60})
+        self.assertEqual(
+            encoding.delta_decode(compact['ts']),
+            [int(datetime.fromisoformat(p['ts']).timestamp()) for p in series],
+        )
+        self.assertEqual(compact['free'], [round(p['free'], 2) for p in series])
+
+    def test_msgpack_trend(self):
+        if encoding.msgpack is None:
+            self.skipTest('msgpack is not installed')
+        response = self.client.get(self.trend_url, self.trend_params, HTTP_ACCEPT=encoding.MSGPACK)
+        self.assertEqual(response['Content-Type'], encoding.MSGPACK)
+        compact = self.client.get(self.trend_url, self.trend_params, HTTP_ACCEPT=encoding.COLUMNAR).json()
+        self.assertEqual(encoding.msgpack.unpackb(response.content), compact)
+
+    def test_responses_are_compressed_when_accepted(self):
+        plain = self.client.get(reverse('stations_api'))
+        response = self.client.get(reverse('stations_api'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertTrue(response['ETag'].startswith('W/'))
+
+        # the weakened ETag still revalidates
+        response = self.client.get(
+            reverse('stations_api'), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.stations = make_stations(2)
+        self.hour = datetime(2025, 11, 18, 8, tzinfo=dt_timezone.utc)
+
+    def scrape(self, minute, free_bikes):
+        rows = citybikes_payload(self.stations, free_bikes)['network']['stations']
+        views.ingest_station_statuses(rows, self.hour + timedelta(minutes=minute))
+
+    def test_ingest_maintains_hourly_and_daily_rollups(self):
+        for minute, free in ((0, 0), (1, 4), (2, 20), (61, 8)):
+            self.scrape(minute, free)
+
+        hourly = StationHourlyRollup.objects.get(station=self.stations[0], bucket=self.hour)
+        self.assertEqual(
+            (hourly.samples, hourly.min_free_bikes, hourly.max_free_bikes,
+             hourly.minutes_empty, hourly.minutes_full),
+            (3, 0, 20, 1, 1),
+        )
+        self.assertEqual(hourly.avg_free_bikes, 8)
+
+        daily = StationDailyRollup.objects.get(station=self.stations[0])
+        self.assertEqual(daily.bucket, datetime(2025, 11, 18, tzinfo=dt_timezone.utc))
+        self.assertEqual((daily.samples, daily.free_bikes_sum, daily.max_free_bikes), (4, 32, 20))
+        self.assertEqual(StationHourlyRollup.objects.count(), 4)
+
+    def test_rebuild_matches_incremental_rollups(self):
+        for minute, free in ((0, 3), (30, 5), (90, 0)):
+            self.scrape(minute, free)
+        incremental = list(StationHourlyRollup.objects.order_by('station', 'bucket').values(
+            'station', 'bucket', 'samples', 'free_bikes_sum', 'minutes_empty'
+        ))
+        StationHourlyRollup.objects.all().delete()
+        StationDailyRollup.objects.all().delete()
+
+        call_command('rebuild_rollups', ignore_retention=True, stdout=io.StringIO())
+        rebuilt = list(StationHourlyRollup.objects.order_by('station', 'bucket').values(
+            'station', 'bucket', 'samples', 'free_bikes_sum', 'minutes_empty'
+        ))
+        self.assertEqual(rebuilt, incremental)
+        self.assertEqual(StationDailyRollup.objects.count(), 2)
+
+    def test_rebuild_after_prune_keeps_older_rollups(self):
+        today = day_floor(timezone.now())
+        recent, old = today - timedelta(days=2), today - timedelta(days=20)
+        for moment in (old, old + timedelta(minutes=30), recent):
+            rows = citybikes_payload(self.stations, 5)['network']['stations']
+            views.ingest_station_statuses(rows, moment)
+        call_command('prune_snapshots', raw_days=14, hourly_days=None, daily_days=None, pause=0,
+                     stdout=io.StringIO())
+        self.assertFalse(StationSnapshot.objects.filter(timestamp__lt=recent).exists())
+
+        call_command('rebuild_rollups', start=old.date().isoformat(), stdout=io.StringIO())
+        old_hour = StationHourlyRollup.objects.get(station=self.stations[0], bucket=old)
+        self.assertEqual(old_hour.samples, 2)
+        self.assertEqual(StationDailyRollup.objects.get(station=self.stations[0], bucket=old).samples, 2)
+        self.assertTrue(StationHourlyRollup.objects.filter(bucket=recent).exists())
+
+
+class PruneSnapshotsTests(TestCase):
+    def setUp(self):
+        self.station = make_stations(1)[0]
+        now = timezone.now()
+        for age_days in (1, 20, 30):
+            moment = now - timedelta(days=age_days)
+            StationSnapshot.objects.create(
+                station=self.station, timestamp=moment, free_bikes=1, empty_slots=19
+            )
+        for model in (StationHourlyRollup, StationDailyRollup):
+            for age_days in (10, 1000):
+                model.objects.create(
+                    station=self.station, bucket=now - timedelta(days=age_days),
+                    samples=1, free_bikes_sum=1, min_free_bikes=1, max_free_bikes=1,
+                    minutes_empty=0, minutes_full=0,
+                )
+
+    def test_policy_is_applied_in_batches(self):
+        out = io.StringIO()
+        call_command('prune_snapshots', batch_size=1, pause=0, stdout=out)
+
+        self.assertEqual(StationSnapshot.objects.count(), 1)
+        self.assertEqual(StationHourlyRollup.objects.count(), 1)
+        self.assertEqual(StationDailyRollup.objects.count(), 2)
+        self.assertIn('snapshots: 2 rows removed in 2 batches', out.getvalue())
+        self.assertIn('daily rollups: kept forever', out.getvalue())
+
+    def test_dry_run_deletes_nothing(self):
+        out = io.StringIO()
+        call_command('prune_snapshots', dry_run=True, raw_days=25, stdout=out)
+        self.assertEqual(StationSnapshot.objects.count(), 3)
+        self.assertIn('snapshots: 1 rows would be removed', out.getvalue())
+
+
+@skipUnlessDBFeature('supports_explaining_query_execution')
+class QueryPlanRegressionTests(TestCase):
+    """
+    EXPLAIN every query issued by the hot endpoints and fail on a full scan
+    of any table that grows with history. Only tables holding one row per
+    station may be scanned, since those queries list every station anyway.
+    """
+    station_sized_tables = {Station._meta.db_table, StationCurrentStatus._meta.db_table}
+    scan = re.compile(r'^SCAN (\w+)')
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('plan text is checked against SQLite output')
+        cache.clear()
+        self.user = User.objects.create_user(username='planner', password='pw')
+        self.client.force_login(self.user)
+        self.station = make_stations(3)[0]
+        rows = citybikes_payload([self.station], 2)['network']['stations']
+        views.ingest_station_statuses(rows)
+
+    def full_scans(self, action):
+        with CaptureQueriesContext(connection) as ctx:
+            action()
+        scans = []
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                for row in cursor.fetchall():
+                    match = self.scan.match(row[-1])
+                    if match and match.group(1) not in self.station_sized_tables:
+                        scans.append(f'{row[-1]}  <-  {sql[:120]}')
+        return scans
+
+    def test_endpoints_use_indexes(self):
+        trend = reverse('station_trend', args=[self.station.id])
+        actions = {
+            'stations_api': lambda: self.client.get(reverse('stations_api')),
+            'station_detail_api': lambda: self.client.get(reverse('station_detail_api', args=[self.station.id])),
+            'station_trend 5m': lambda: self.client.get(trend),
+            'station_trend hour': lambda: self.client.get(trend, {'granularity': 'hour'}),
+            'station_trend day': lambda: self.client.get(trend, {'granularity': 'day', 'start': '2026-01-01'}),
+            'stations_trend 5m': lambda: self.client.get(reverse('stations_trend'), {'ids': f'{self.station.id},2,3'}),
+            'stations_trend hour': lambda: self.client.get(
+                reverse('stations_trend'), {'ids': f'{self.station.id},2,3', 'granularity': 'hour'}
+            ),
+            'station_comments_api': lambda: self.client.get(reverse('station_comments_api', args=[self.station.id])),
+            'latest snapshot': lambda: StationSnapshot.objects.filter(station=self.station).latest(),
+            'ingest': lambda: views.ingest_station_statuses(
+                citybikes_payload([self.station], 3)['network']['stations']
+            ),
+            'prune_snapshots': lambda: call_command(
+                'prune_snapshots', raw_days=0, hourly_days=0, daily_days=0, pause=0, stdout=io.StringIO()
+            ),
+        }
+        for name, action in actions.items():
+            with self.subTest(name):
+                self.assertEqual(self.full_scans(action), [])
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_percentile_is_nearest_rank(self):
+        ordered = list(range(1, 101))
+        self.assertEqual(benchmarks.percentile(ordered, 50), 50)
+        self.assertEqual(benchmarks.percentile(ordered, 99), 99)
+        self.assertEqual(benchmarks.percentile([7], 99), 7)
+
+    def test_suite_reports_every_endpoint(self):
+        report = benchmarks.run_suite({'tiny': {'stations': 3, 'days': 1, 'interval': 60}}, repeat=2, fan_out=[5])
+        scale = report['scales']['tiny']
+        self.assertEqual(scale['dataset']['snapshots'], 3 * 24)
+        self.assertIn('stations_api cold', scale['http'])
+        for name, result in scale['http'].items():
+            with self.subTest(name):
+                self.assertEqual(result['status'], [200])
+                self.assertEqual(result['samples'], 2)
+                self.assertGreater(result['bytes'], 0)
+        self.assertEqual(
+            set(scale['websocket']),
+            {'comments connect', 'comments load_comments', 'comments add_comment x20',
+             'tour create_tour_bulk x20', 'tour add_stop'},
+        )
+        self.assertGreater(scale['websocket']['tour create_tour_bulk x20']['queries'], 0)
+        if analytics.np is not None:
+            self.assertEqual(scale['station_metrics']['stations'], 3)
+        self.assertEqual(
+            [(run['clients'], run['messages']) for run in scale['fan_out']],
+            [(5, benchmarks.FAN_OUT_MESSAGES)],
+        )
+        json.dumps(report)
@@ -20,4 +20,6 @@ urlpatterns = [
     path('api/stations/<int:station_id>/comments/', views.station_comments_api, name='station_comments_api'),
     path('api/stations/<int:station_id>/comments/add/', views.add_comment_api, name='add_comment_api'),
     path("api/stations/<int:station_id>/trend/", views.station_trend, name="station_trend"),
+    path("api/stations/trend/", views.stations_trend, name="stations_trend"),
+    path("api/analytics/", views.network_analytics, name="network_analytics"),
     ]
@@ -1,18 +1,36 @@
+import json
 from datetime import datetime, timedelta, timezone as dt_timezone
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
-from django.db.models import Avg
-from django.db.models.functions import TruncHour
+from django.db import transaction
+from django.views.decorators.http import condition, require_POST
+from django.db.models import Avg, IntegerField, Max
 from django.views.decorators.http import require_GET
-from django.db.models.functions import TruncHour, TruncDate
-
+from django.db.models.functions import Cast, ExtractMinute, Floor, TruncHour
+from django.utils.dateparse import parse_date, parse_datetime
+
+from dashboard import analytics
+from dashboard.consumers import StationStatusConsumer
+from dashboard.encoding import (
+    JSON, MEDIA_TYPE_TAGS, columns, compress_response, delta_encode, encode,
+    encoded_response, epoch_seconds, negotiate,
+)
 from dashboard.forms import LoginForm, RegisterForm
-from dashboard.models import Station, StationStatusLog, Comment
+from dashboard.models import (
+    Station, StationCurrentStatus, Comment,
+    StationDailyRollup, StationHourlyRollup,
+)
+from dashboard.rollups import day_floor, hour_floor, update_rollups
+from dashboard.spatial import StationGrid
 
 from .models import StationSnapshot  
 from datetime import timedelta
@@ -24,6 +42,17 @@ except ImportError:
     requests = None
 
 
+CITYBIKES_URL = "https://api.citybik.es/v2/networks/pittsburgh"
+INGEST_BATCH_SIZE = 500
+STATIONS_CACHE_VERSION_KEY = "stations_api:version"
+STATION_STATUSES = ("bad_empty", "low", "ok", "high", "bad_full")
+STATION_FIELDS = (
+    "id", "name", "latitude", "longitude", "slots",
+    "free_bikes", "empty_slots", "pct_full", "status",
+    "minutes_until_empty", "minutes_until_full",
+)
+
+
 def home(request):
     if request.user.is_authenticated:
         return redirect('dashboard_overview')
@@ -35,7 +64,7 @@ def home(request):
 def fetch_data():
     if requests is None:
         raise RuntimeError("requests is not installed.")
-    response = requests.get("https://api.citybik.es/v2/networks/pittsburgh", timeout=10)
+    response = requests.get(CITYBIKES_URL, timeout=10)
     response.raise_for_status()
     return response.json()
 
@@ -56,41 +85,272 @@ def set_stations():
         )
 
 
-def is_empty(free_bikes):
-    return free_bikes == 0
+def classify_status(pct_full):
+    if pct_full == 0:
+        return "bad_empty"
+    if pct_full <= 15:
+        return "low"
+    if pct_full <= 75:
+        return "ok"
+    if pct_full <= 90:
+        return "high"
+    if pct_full >= 100:
+        return "bad_full"
+    return "ok"
 
 
-def is_full(empty_slots):
-    return empty_slots == 0
+def status_fields(free_bikes, empty_slots, slots):
+    capacity = free_bikes + empty_slots or slots or 1
+    pct_full = round(100 * free_bikes / capacity)
+    return {
+        "free_bikes": free_bikes,
+        "empty_slots": empty_slots,
+        "pct_full": pct_full,
+        "status": classify_status(pct_full),
+    }
+
+
+def station_status_payload(s):
+    """
+    Build the map/detail payload for a station annotated by
+    Station.with_latest_status().
+    """
+    if s.latest_free_bikes is not None:
+        free_bikes = s.latest_free_bikes
+        empty_slots = s.latest_empty_slots
+    else:
+        # Fallback if no logs: assume zero bikes (still renders markers)
+        free_bikes = 0
+        empty_slots = max(s.slots - free_bikes, 0)
+
+    return {
+        "id": s.id,
+        "name": s.name,
+        "latitude": float(s.latitude),
+        "longitude": float(s.longitude),
+        "slots": s.slots,
+        **status_fields(free_bikes, empty_slots, s.slots),
+    }
+
+
+def scrape_version(scraped_at):
+    return scraped_at.strftime("%Y%m%d%H%M%S%f")
+
+
+def invalidate_stations_cache(scraped_at):
+    """
+    Point the /api/stations/ cache at a new scrape; bodies cached under older
+    versions are simply never read again and expire on their own.
+    """
+    cache.set(
+        STATIONS_CACHE_VERSION_KEY,
+        scrape_version(scraped_at),
+        settings.STATIONS_CACHE_VERSION_TTL,
+    )
+
+
+def stations_cache_version():
+    """
+    Id of the latest scrape (None before the first one), read from the cache
+    and, at most every STATIONS_CACHE_VERSION_TTL seconds, from
+    StationCurrentStatus.
+    """
+    version = cache.get(STATIONS_CACHE_VERSION_KEY)
+    if version is None:
+        latest = StationCurrentStatus.objects.aggregate(latest=Max("updated_at"))["latest"]
+        if latest is None:
+            return None
+        version = scrape_version(latest)
+        cache.set(STATIONS_CACHE_VERSION_KEY, version, settings.STATIONS_CACHE_VERSION_TTL)
+    return version
+
+
+# per-process grid of the latest payload, rebuilt once per scrape version
+_station_grids = {}
+
+
+def station_grid(version):
+    grid = _station_grids.get(version) if version is not None else None
+    if grid is None:
+        stations = Station.with_latest_status().order_by('name')
+        now = timezone.now()
+        rates = analytics.upcoming_rates(now)
+        payload = []
+        for s in stations:
+            item = station_status_payload(s)
+            until_empty = until_full = None
+            if s.latest_free_bikes is not None and s.id in rates:
+                until_empty, until_full = analytics.minutes_until(
+                    item["free_bikes"], item["free_bikes"] + item["empty_slots"], rates[s.id], now
+                )
+            item["minutes_until_empty"] = until_empty
+            item["minutes_until_full"] = until_full
+            payload.append(item)
+        grid = StationGrid(payload)
+        if version is not None:
+            _station_grids.clear()
+            _station_grids[version] = grid
+    return grid
+
+
+def parse_csv(value):
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def parse_station_filters(params):
+    """
+    Read the optional bbox=west,south,east,north, status=a,b and
+    fields=a,b parameters of /api/stations/; raises ValueError with a
+    client-facing message.
+    """
+    bbox = None
+    if "bbox" in params:
+        try:
+            west, south, east, north = (float(part) for part in params["bbox"].split(","))
+        except ValueError:
+            raise ValueError("bbox must be west,south,east,north in degrees.")
+        # also rules out the nan, inf and huge values float() accepts, which
+        # overflow the grid's cell arithmetic
+        if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+            raise ValueError("bbox must be west,south,east,north in degrees.")
+        bbox = (south, west, north, east)
+
+    statuses = None
+    if "status" in params:
+        statuses = set(parse_csv(params["status"]))
+        if not statuses or statuses - set(STATION_STATUSES):
+            raise ValueError(f"status must be among {', '.join(STATION_STATUSES)}.")
+
+    fields = None
+    if "fields" in params:
+        fields = parse_csv(params["fields"])
+        if not fields or set(fields) - set(STATION_FIELDS):
+            raise ValueError(f"fields must be among {', '.join(STATION_FIELDS)}.")
+        # the id is what clients merge live station deltas on
+        fields = ["id", *(field for field in dict.fromkeys(fields) if field != "id")]
+
+    return bbox, statuses, fields
+
+
+def stations_etag(request):
+    version = stations_cache_version()
+    media_type = negotiate(request)
+    if version is None or media_type == JSON:
+        return version
+    # each representation of a scrape needs its own validator
+    return f"{version}-{MEDIA_TYPE_TAGS[media_type]}"
+
+
+def stations_payload(stations, fields, media_type):
+    if media_type != JSON:
+        return {"stations": columns(stations, fields or STATION_FIELDS)}
+    if fields is not None:
+        stations = [{field: st[field] for field in fields} for st in stations]
+    return {"stations": stations}
+
+
+def broadcast_station_delta(changes):
+    """
+    Push the stations whose counts changed in a scrape to every open map.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(
+        StationStatusConsumer.group_name,
+        {
+            'type': 'broadcast_event',
+            'message': json.dumps({'action': 'station_delta', 'stations': changes}),
+        }
+    )
 
 
 def set_station_status_log():
     if requests is None:
-        return
+        return 0
     data = fetch_data()
-    stations = data["network"]["stations"]
-
+    return ingest_station_statuses(data["network"]["stations"])
+
+
+def ingest_station_statuses(stations, scraped_at=None):
+    """
+    Write one scrape of CityBikes station dicts in a single transaction and
+    return the number of snapshots stored. Every row of the scrape shares one
+    timestamp; a repeated scrape of the same instant is ignored thanks to
+    the uniq_station_timestamp constraint.
+    """
+    scraped_at = scraped_at or timezone.now()
+    station_rows = list(Station.objects.values_list("name", "id", "slots"))
+    station_ids = {name: station_id for name, station_id, _ in station_rows}
+    slots_by_id = {station_id: slots for _, station_id, slots in station_rows}
+
+    snapshots = []
+    current = []
     for s in stations:
-        station = Station.objects.filter(name=s["name"]).first()
-        if not station:
+        station_id = station_ids.get(s["name"])
+        if station_id is None:
             continue
-        StationStatusLog.objects.create(
-            date=timezone.now().date(),
-            time=timezone.now().time(),
-            empty_slots=s["empty_slots"],
+        snapshots.append(StationSnapshot(
+            station_id=station_id,
+            timestamp=scraped_at,
             free_bikes=s["free_bikes"],
-            empty=is_empty(s["free_bikes"]),
-            full=is_full(s["empty_slots"]),
-            station=station,
-        )
-    
-        # write the snapshot row used by the trend chart
-        StationSnapshot.objects.create(
-            station=station,
-            timestamp=timezone.now(),  
+            empty_slots=s["empty_slots"],
+        ))
+        current.append(StationCurrentStatus(
+            station_id=station_id,
+            updated_at=scraped_at,
             free_bikes=s["free_bikes"],
             empty_slots=s["empty_slots"],
+        ))
+
+    with transaction.atomic():
+        # skip stations already stored for this instant; ignore_conflicts
+        # below covers a concurrent collector racing us on the constraint
+        seen = set(
+            StationSnapshot.objects.filter(timestamp=scraped_at)
+            .values_list("station_id", flat=True)
+        )
+        if seen:
+            snapshots = [row for row in snapshots if row.station_id not in seen]
+            current = [row for row in current if row.station_id not in seen]
+
+        previous = {
+            station_id: (free_bikes, empty_slots, updated_at)
+            for station_id, free_bikes, empty_slots, updated_at in StationCurrentStatus.objects.values_list(
+                "station_id", "free_bikes", "empty_slots", "updated_at"
+            )
+        }
+        # only stations whose counts moved are pushed to open maps
+        changes = [
+            {
+                "id": row.station_id,
+                **status_fields(row.free_bikes, row.empty_slots, slots_by_id[row.station_id]),
+            }
+            for row in current
+            if previous.get(row.station_id, ())[:2] != (row.free_bikes, row.empty_slots)
+        ]
+
+        StationSnapshot.objects.bulk_create(
+            snapshots, batch_size=INGEST_BATCH_SIZE, ignore_conflicts=True
+        )
+        StationCurrentStatus.objects.bulk_create(
+            current,
+            batch_size=INGEST_BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=["station"],
+            update_fields=["updated_at", "free_bikes", "empty_slots"],
         )
+        update_rollups(scraped_at)
+        # each station's change since its previous scrape feeds the forecasts
+        analytics.update_baselines(scraped_at, [
+            (row.station_id, previous[row.station_id][2], previous[row.station_id][0], row.free_bikes)
+            for row in current if row.station_id in previous
+        ])
+        if current:
+            transaction.on_commit(lambda: invalidate_stations_cache(scraped_at))
+        if changes:
+            transaction.on_commit(lambda: broadcast_station_delta(changes))
+    return len(snapshots)
 
 
 
@@ -156,78 +416,14 @@ def tour_view(request):
 
 # -------------------- APIs --------------------
 
-@login_required
-def stations_api(request):
-    stations = Station.objects.all().order_by('name')
-    payload = []
-
-    for s in stations:
-        log = (
-            StationStatusLog.objects.filter(station=s)
-            .order_by('-date', '-time')
-            .first()
-        )
-        if log:
-            free_bikes = log.free_bikes
-            empty_slots = log.empty_slots
-        else:
-            free_bikes = 0
-            # assume unknown empties => capacity = slots
-            empty_slots = max(s.slots - free_bikes, 0)
-
-        capacity = free_bikes + empty_slots or s.slots or 1
-        pct_full = round(100 * free_bikes / capacity)
-
-        if free_bikes == 0:
-            status = "empty"
-        elif empty_slots == 0:
-            status = "full"
-        else:
-            status = "between"
-
-        payload.append(
-            {
-                "id": s.id,
-                "name": s.name,
-                "latitude": float(s.latitude),
-                "longitude": float(s.longitude),
-                "slots": s.slots,
-                "free_bikes": free_bikes,
-                "empty_slots": empty_slots,
-                "pct_full": pct_full,
-                "status": status,
-            }
-        )
-
-    return JsonResponse({"stations": payload})
-
-
 @login_required
 def station_detail_api(request, station_id):
-    s = get_object_or_404(Station, pk=station_id)
-    log = (
-        StationStatusLog.objects.filter(station=s)
-        .order_by('-date', '-time')
-        .first()
-    )
-    if log:
-        free_bikes = log.free_bikes
-        empty_slots = log.empty_slots
-    else:
-        free_bikes = 0
-        empty_slots = max(s.slots - free_bikes, 0)
-
-    capacity = free_bikes + empty_slots or s.slots or 1
-    pct_full = round(100 * free_bikes / capacity)
-
+    s = get_object_or_404(Station.with_latest_status(), pk=station_id)
+    payload = station_status_payload(s)
     return JsonResponse(
         {
-            "id": s.id,
-            "name": s.name,
-            "slots": s.slots,
-            "free_bikes": free_bikes,
-            "empty_slots": empty_slots,
-            "pct_full": pct_full,
+            key: payload[key]
+            for key in ("id", "name", "slots", "free_bikes", "empty_slots", "pct_full", "status")
         }
     )
 
@@ -235,13 +431,10 @@ def station_detail_api(request, station_id):
 @login_required
 def station_trend_api(request, station_id):
     station = get_object_or_404(Station, pk=station_id)
-    logs = (
-        StationStatusLog.objects.filter(station=station)
-        .order_by('-date', '-time')[:24]
-    )
-    logs = list(reversed(logs))
-    labels = [l.time.strftime('%H:%M') for l in logs]
-    values = [l.free_bikes for l in logs]
+    snapshots = StationSnapshot.objects.filter(station=station).order_by('-timestamp')[:24]
+    snapshots = list(reversed(snapshots))
+    labels = [timezone.localtime(s.timestamp).strftime('%H:%M') for s in snapshots]
+    values = [s.free_bikes for s in snapshots]
     return JsonResponse({"labels": labels, "values": values})
 
 
@@ -289,98 +482,326 @@ def add_comment_api(request, station_id):
     )
 
 @login_required
+@compress_response
+@condition(etag_func=stations_etag)
 def stations_api(request):
+    try:
+        bbox, statuses, fields = parse_station_filters(request.GET)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    media_type = negotiate(request)
+
+    version = stations_cache_version()
+
     # If no stations yet, try to seed once from CityBikes (if 'requests' is available)
-    if not Station.objects.exists() and requests is not None:
+    if version is None and not Station.objects.exists() and requests is not None:
         try:
             set_stations()
             set_station_status_log()
         except Exception:
             # On failure, continue with whatever data exists (likely none)
             pass
-
-    stations = Station.objects.all().order_by('name')
-    payload = []
-
-    for s in stations:
-        # Latest status log for this station
-        log = (
-            StationStatusLog.objects.filter(station=s)
-            .order_by('-date', '-time')
-            .first()
+        version = stations_cache_version()
+
+    if bbox is None and statuses is None and fields is None:
+        # Every client gets the same body between scrapes, so it is serialized
+        # once per scrape and format, and cached under the scrape version.
+        body_key = f"stations_api:body:{MEDIA_TYPE_TAGS[media_type]}:{version}"
+        body = cache.get(body_key) if version is not None else None
+        if body is None:
+            payload = stations_payload(station_grid(version).stations, None, media_type)
+            body = encode(payload, media_type)
+            if version is not None:
+                cache.set(body_key, body, settings.STATIONS_CACHE_TIMEOUT)
+    else:
+        grid = station_grid(version)
+        stations = grid.within(*bbox) if bbox is not None else grid.stations
+        if statuses is not None:
+            stations = [st for st in stations if st["status"] in statuses]
+        body = encode(stations_payload(stations, fields, media_type), media_type)
+
+    response = encoded_response(body, media_type)
+    # let browsers keep the body but revalidate it with If-None-Match
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+TREND_GRANULARITIES = {
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+MAX_TREND_POINTS = 500
+MAX_BULK_TREND_STATIONS = 200
+BULK_TREND_PAGE_SIZE = 20
+ROLLUP_MODELS = {
+    "hour": (StationHourlyRollup, hour_floor),
+    "day": (StationDailyRollup, day_floor),
+}
+
+
+def pick_granularity(start, end, requested=None):
+    """
+    Return the finest granularity, no finer than `requested`, that keeps the
+    window at MAX_TREND_POINTS buckets or fewer (None if even days are too many).
+    """
+    names = list(TREND_GRANULARITIES)
+    if requested is not None:
+        names = names[names.index(requested):]
+    for name in names:
+        if (end - start) / TREND_GRANULARITIES[name] <= MAX_TREND_POINTS:
+            return name
+    return None
+
+
+def parse_trend_time(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        parsed = datetime.combine(day, datetime.min.time())
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def trend_series_by_station(station_ids, start, end, granularity):
+    """
+    {station_id: [(bucket start, average free bikes), ...]} for [start, end)
+    in one grouped query, whatever the number of stations. Hours and days
+    read the pre-aggregated rollups; sub-hour buckets group raw snapshots on
+    (hour, minute // step) so the bucketing stays portable across database
+    backends.
+    """
+    series = {station_id: [] for station_id in station_ids}
+
+    if granularity in ROLLUP_MODELS:
+        model, floor = ROLLUP_MODELS[granularity]
+        # buckets sit on UTC boundaries whatever offset the caller used
+        rollups = model.objects.filter(
+            station_id__in=station_ids,
+            bucket__gte=floor(start.astimezone(dt_timezone.utc)),
+            bucket__lt=end,
+        ).order_by("station_id", "bucket").values_list(
+            "station_id", "bucket", "free_bikes_sum", "samples"
         )
+        for station_id, bucket, total, samples in rollups:
+            series[station_id].append((bucket, total / samples))
+        return series
 
-        if log:
-            free_bikes = log.free_bikes
-            empty_slots = log.empty_slots
-        else:
-            # Fallback if no logs: assume zero bikes (still renders markers)
-            free_bikes = 0
-            empty_slots = max(s.slots - free_bikes, 0)
-
-        capacity = free_bikes + empty_slots or s.slots or 1
-        pct_full = round(100 * free_bikes / capacity)
-
-        if pct_full == 0:
-            status = "bad_empty"
-        elif pct_full <= 15:
-            status = "low"
-        elif pct_full <= 75:
-            status = "ok"
-        elif pct_full <= 90:
-            status = "high"
-        elif pct_full >= 100:
-            status = "bad_full"
-        else:
-            status = "ok"
-
-        payload.append({
-            "id": s.id,
-            "name": s.name,
-            "latitude": float(s.latitude),
-            "longitude": float(s.longitude),
-            "slots": s.slots,
-            "free_bikes": free_bikes,
-            "empty_slots": empty_slots,
-            "pct_full": pct_full,
-            "status": status,
-        })
-
-    return JsonResponse({"stations": payload})
+    step = TREND_GRANULARITIES[granularity]
+    minutes = int(step.total_seconds() // 60)
+    rows = (
+        StationSnapshot.objects
+        .filter(station_id__in=station_ids, timestamp__gte=start, timestamp__lt=end)
+        .annotate(
+            bucket=TruncHour("timestamp"),
+            # EXTRACT is numeric on PostgreSQL: floor explicitly rather
+            # than relying on SQLite's integer division
+            slot=Cast(Floor(ExtractMinute("timestamp") / minutes), IntegerField()),
+        )
+        .values("station_id", "bucket", "slot")
+        .annotate(free=Avg("free_bikes"))
+        .order_by("station_id", "bucket", "slot")
+    )
+    for r in rows:
+        series[r["station_id"]].append((r["bucket"] + step * r["slot"], r["free"]))
+    return series
+
+
+def trend_series(station_id, start, end, granularity):
+    return trend_series_by_station([station_id], start, end, granularity)[station_id]
+
+
+def series_payload(series, media_type):
+    if media_type == JSON:
+        return [{"ts": bucket.isoformat(), "free": free} for bucket, free in series]
+    # compact formats: bucket starts as delta-encoded epoch seconds and
+    # averages to two decimals
+    return {
+        "ts": delta_encode([epoch_seconds(bucket) for bucket, _ in series]),
+        "free": [round(free, 2) for _, free in series],
+    }
+
+
+def trend_window_payload(granularity, start, end, media_type):
+    format_time = epoch_seconds if media_type != JSON else (lambda moment: moment.isoformat())
+    return {"granularity": granularity, "start": format_time(start), "end": format_time(end)}
+
+
+def parse_trend_window(params):
+    """
+    (start, end, granularity) of a trend request, defaulting to the last
+    24 hours at the finest granularity that fits; raises ValueError with a
+    client-facing message.
+    """
+    try:
+        end = parse_trend_time(params["end"]) if "end" in params else timezone.now()
+        start = (
+            parse_trend_time(params["start"]) if "start" in params
+            else end - timedelta(hours=24)
+        )
+    except ValueError as exc:
+        raise ValueError(f"Invalid datetime: {exc}")
+    if start >= end:
+        raise ValueError("start must be before end.")
+
+    requested = params.get("granularity")
+    if requested is not None and requested not in TREND_GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(TREND_GRANULARITIES)}.")
+
+    granularity = pick_granularity(start, end, requested)
+    if granularity is None:
+        raise ValueError(f"Range too long for {MAX_TREND_POINTS} daily points.")
+    return start, end, granularity
+
+
+def parse_station_ids(value):
+    try:
+        station_ids = list(dict.fromkeys(int(part) for part in parse_csv(value)))
+    except ValueError:
+        raise ValueError("ids must be comma-separated station ids.")
+    # ids must fit the database's 64-bit integer column
+    if not all(0 < station_id < 2 ** 63 for station_id in station_ids):
+        raise ValueError("ids must be comma-separated station ids.")
+    if not station_ids:
+        raise ValueError("ids must list at least one station id.")
+    if len(station_ids) > MAX_BULK_TREND_STATIONS:
+        raise ValueError(f"At most {MAX_BULK_TREND_STATIONS} stations per request.")
+    return station_ids
 
 
+@login_required
 @require_GET
+@compress_response
 def station_trend(request, station_id: int):
+    try:
+        start, end, granularity = parse_trend_window(request.GET)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
 
-    # ---- fixed 24-hour window ---------------------------------------------
-    FIXED_DAY = datetime(2025, 11, 18, tzinfo=dt_timezone.utc)
-    start     = FIXED_DAY
-    end       = FIXED_DAY + timedelta(hours=24)
+    series = trend_series(station_id, start, end, granularity)
+    media_type = negotiate(request)
+    payload = {
+        **trend_window_payload(granularity, start, end, media_type),
+        "series": series_payload(series, media_type),
+    }
+    return encoded_response(encode(payload, media_type), media_type)
 
-    hourly_qs = (
-        StationSnapshot.objects
-        .filter(station_id=station_id,
-                timestamp__gte=start,
-                timestamp__lt=end)
-        .annotate(bucket=TruncHour("timestamp"))
-        .values("bucket")
-        .annotate(free=Avg("free_bikes"))
-        .order_by("bucket")
-    )
 
-    if hourly_qs.exists():
-        series = [{"ts": r["bucket"].isoformat(), "free": r["free"]} for r in hourly_qs]
-        return JsonResponse({"granularity": "hour", "series": series})
+@login_required
+@require_GET
+@compress_response
+def stations_trend(request):
+    """
+    Trends of several stations (?ids=1,2,3) for comparison charts, one
+    grouped query per page of BULK_TREND_PAGE_SIZE stations.
+    """
+    try:
+        start, end, granularity = parse_trend_window(request.GET)
+        station_ids = parse_station_ids(request.GET.get("ids", ""))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    pages = -(-len(station_ids) // BULK_TREND_PAGE_SIZE)
+    page = request.GET.get("page", "1")
+    if not page.isdigit() or not 1 <= int(page) <= pages:
+        return JsonResponse({"error": f"page must be between 1 and {pages}."}, status=400)
+    page = int(page)
+
+    page_ids = station_ids[(page - 1) * BULK_TREND_PAGE_SIZE:page * BULK_TREND_PAGE_SIZE]
+    series = trend_series_by_station(page_ids, start, end, granularity)
+    media_type = negotiate(request)
+    payload = {
+        **trend_window_payload(granularity, start, end, media_type),
+        "page": page,
+        "pages": pages,
+        "stations": [
+            {"id": station_id, "series": series_payload(series[station_id], media_type)}
+            for station_id in page_ids
+        ],
+    }
+    return encoded_response(encode(payload, media_type), media_type)
+
+
+ANALYTICS_STEPS = {
+    "1m": timedelta(minutes=1),
+    "5m": timedelta(minutes=5),
+    "15m": timedelta(minutes=15),
+    "hour": timedelta(hours=1),
+}
+MAX_ANALYTICS_WINDOW = timedelta(days=7)
+# stations x time buckets per request: bounds the matrices held in memory
+MAX_ANALYTICS_CELLS = 1_000_000
+
+
+def pick_analytics_step(station_count, start, end, requested=None):
+    """
+    Return the finest step, no finer than `requested`, that keeps the
+    station x time matrices at MAX_ANALYTICS_CELLS cells or fewer (None if
+    even hours are too many).
+    """
+    names = list(ANALYTICS_STEPS)
+    if requested is not None:
+        names = names[names.index(requested):]
+    for name in names:
+        if station_count * -(-(end - start) // ANALYTICS_STEPS[name]) <= MAX_ANALYTICS_CELLS:
+            return name
+    return None
+
+
+def rounded_or_none(values, digits=1):
+    return [None if value != value else round(value, digits) for value in values.tolist()]
 
-    # ---- fallback: one daily point for the same date -----------------------
-    daily_qs = (
-        StationSnapshot.objects
-        .filter(station_id=station_id,
-                timestamp__date=FIXED_DAY.date())
-        .annotate(bucket=TruncDate("timestamp"))
-        .values("bucket")
-        .annotate(free=Avg("free_bikes"))
-    )
 
-    series = [{"ts": r["bucket"].isoformat(), "free": r["free"]} for r in daily_qs]
-    return JsonResponse({"granularity": "day", "series": series})
\ No newline at end of file
+@login_required
+@require_GET
+@compress_response
+def network_analytics(request):
+    """
+    Percent-time-empty/full, turnover and rebalancing need of every station
+    over a window of raw snapshots (default: the last 24 hours), computed
+    on station x time NumPy matrices at the finest step that fits
+    MAX_ANALYTICS_CELLS.
+    """
+    if analytics.np is None:
+        return JsonResponse({"error": "numpy is not installed."}, status=503)
+    try:
+        end = parse_trend_time(request.GET["end"]) if "end" in request.GET else timezone.now()
+        start = (
+            parse_trend_time(request.GET["start"]) if "start" in request.GET
+            else end - timedelta(hours=24)
+        )
+    except ValueError as exc:
+        return JsonResponse({"error": f"Invalid datetime: {exc}"}, status=400)
+    if not timedelta(0) < end - start <= MAX_ANALYTICS_WINDOW:
+        return JsonResponse(
+            {"error": f"start must be before end, at most {MAX_ANALYTICS_WINDOW.days} days apart."},
+            status=400,
+        )
+    requested = request.GET.get("step")
+    if requested is not None and requested not in ANALYTICS_STEPS:
+        return JsonResponse(
+            {"error": f"step must be one of {', '.join(ANALYTICS_STEPS)}."}, status=400
+        )
+    step_name = pick_analytics_step(Station.objects.count(), start, end, requested)
+    if step_name is None:
+        return JsonResponse(
+            {"error": f"Window too long for {MAX_ANALYTICS_CELLS} station-hours."}, status=400
+        )
+
+    matrix = analytics.load_station_matrix(start, end, ANALYTICS_STEPS[step_name])
+    metrics = analytics.station_metrics(matrix)
+    rounded = {key: rounded_or_none(values) for key, values in metrics.items()}
+    return JsonResponse({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "step": step_name,
+        "network": analytics.network_summary(metrics),
+        "stations": [
+            {"id": station_id, **{key: values[i] for key, values in rounded.items()}}
+            for i, station_id in enumerate(matrix.station_ids.tolist())
+        ],
+    })
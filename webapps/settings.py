@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,10 +45,78 @@ INSTALLED_APPS = [
 
 ASGI_APPLICATION = 'webapps.asgi.application'
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
-    },
+# Channel layer: "memory" keeps everything inside one process, which is only
+# correct for a single Daphne worker. Set DASHBOARD_CHANNEL_LAYER=redis (and
+# install channels-redis) to run several workers plus the collect_snapshots
+# daemon against one shared layer.
+CHANNEL_LAYER = os.environ.get("DASHBOARD_CHANNEL_LAYER", "memory")
+
+if CHANNEL_LAYER == "redis":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [os.environ.get("DASHBOARD_REDIS_URL", "redis://127.0.0.1:6379/0")],
+                "prefix": os.environ.get("DASHBOARD_CHANNEL_PREFIX", "pogoh"),
+            },
+        },
+    }
+elif CHANNEL_LAYER == "memory":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer"
+        },
+    }
+else:
+    # dotted path to any other channel layer backend
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": CHANNEL_LAYER
+        },
+    }
+
+# Cache: "memory" is per process, so a scrape by the collect_snapshots daemon
+# only reaches the web workers once their cached scrape version expires
+# (STATIONS_CACHE_VERSION_TTL). Set DASHBOARD_CACHE=redis to share one cache
+# and have every scrape invalidate the map payload immediately.
+CACHE_BACKEND = os.environ.get("DASHBOARD_CACHE", "memory")
+
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("DASHBOARD_REDIS_URL", "redis://127.0.0.1:6379"),
+            "KEY_PREFIX": os.environ.get("DASHBOARD_CHANNEL_PREFIX", "pogoh"),
+        },
+    }
+elif CACHE_BACKEND == "memory":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+else:
+    # dotted path to any other cache backend
+    CACHES = {
+        "default": {
+            "BACKEND": CACHE_BACKEND,
+            "LOCATION": os.environ.get("DASHBOARD_CACHE_LOCATION", ""),
+        },
+    }
+
+# Seconds a serialized /api/stations/ body is kept (a scrape replaces it
+# sooner) and seconds a worker trusts its cached scrape version before
+# re-reading it from the database.
+STATIONS_CACHE_TIMEOUT = 300
+STATIONS_CACHE_VERSION_TTL = 5
+
+# How long time-series rows are kept, in days (None keeps them forever).
+# Enforced by `manage.py prune_snapshots`; raw covers StationSnapshot,
+# hourly/daily the rollup tables.
+SNAPSHOT_RETENTION_DAYS = {
+    "raw": 14,
+    "hourly": 730,
+    "daily": None,
 }
 
 MIDDLEWARE = [